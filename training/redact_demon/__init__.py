@@ -0,0 +1 @@
+"""Training and offline redaction helpers for the Redact Demon PII model."""
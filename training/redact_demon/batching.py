@@ -0,0 +1,175 @@
+"""Dynamic padding and length-bucketed batching for the token-classification trainer.
+
+Padding every example to max_length=128 means most of a batch of 10-25 token
+sentences is pad tokens. Here batches are padded only to their longest member
+(DataCollatorForTokenClassification) and are drawn from buckets of similar
+length, so that longest member is close to everyone else.
+"""
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Sampler
+from transformers import DataCollatorForTokenClassification, Trainer
+
+
+class LengthBucketBatchSampler(Sampler):
+    """Yield batches of indices whose examples have similar lengths.
+
+    Each epoch the indices are shuffled, cut into buckets of
+    batch_size * bucket_multiplier, each bucket is sorted by length and sliced
+    into batches, and the batch order is shuffled again. Buckets keep some
+    randomness in which examples share a batch; sorting inside them keeps
+    padding low.
+    """
+
+    def __init__(self, lengths, batch_size, bucket_multiplier=50, shuffle=True, seed=42, drop_last=False):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = batch_size * bucket_multiplier
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        batches = []
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            for b in range(0, len(bucket), self.batch_size):
+                batch = bucket[b:b + self.batch_size]
+                if len(batch) == self.batch_size or not self.drop_last:
+                    batches.append(batch.tolist())
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        full, rest = divmod(len(self.lengths), self.bucket_size)
+        return full * -(-self.bucket_size // self.batch_size) + -(-rest // self.batch_size)
+
+
+def random_batches(num_examples, batch_size, seed=42):
+    """Plain shuffled batches, as the default Trainer sampler draws them."""
+    order = np.random.default_rng(seed).permutation(num_examples)
+    return [order[i:i + batch_size].tolist() for i in range(0, num_examples, batch_size)]
+
+
+def padding_waste(lengths, batches, pad_to=None):
+    """Fraction of token positions in `batches` that are padding.
+
+    pad_to=None pads each batch to its longest example (dynamic padding);
+    pad_to=128 reproduces padding="max_length".
+    """
+    lengths = np.asarray(lengths)
+    real = padded = 0
+    for batch in batches:
+        batch_lengths = lengths[batch]
+        width = pad_to or batch_lengths.max()
+        real += int(batch_lengths.sum())
+        padded += width * len(batch)
+    return 1 - real / padded if padded else 0.0
+
+
+def _train_step(model, dataset, columns, batch_indices, collator):
+    """One forward + backward pass over a batch; returns its attention mask."""
+    batch = collator([{c: dataset[i][c] for c in columns} for i in batch_indices])
+    loss = model(**batch).loss
+    loss.backward()
+    model.zero_grad(set_to_none=True)
+    return batch["attention_mask"]
+
+
+def measure_throughput(model, dataset, batches, collator, max_steps=20, warmup_steps=1):
+    """Time forward + backward passes over `max_steps` batches after `warmup_steps` untimed ones.
+
+    The warm-up steps absorb one-off costs (allocator growth, kernel selection,
+    lazy initialisation) that would otherwise be charged to whichever
+    configuration happens to run first. Returns real (non-pad) tokens/sec,
+    padded positions/sec and the padding waste of the timed batches, without
+    updating the weights.
+    """
+    model.train()
+    columns = [c for c in ("input_ids", "attention_mask", "labels") if c in dataset.column_names]
+    for batch_indices in batches[:warmup_steps]:
+        _train_step(model, dataset, columns, batch_indices, collator)
+    real = padded = 0
+    started = time.perf_counter()
+    for batch_indices in batches[warmup_steps:warmup_steps + max_steps]:
+        mask = _train_step(model, dataset, columns, batch_indices, collator)
+        real += int(mask.sum())
+        padded += mask.numel()
+    elapsed = time.perf_counter() - started
+    return {
+        "tokens_per_sec": real / elapsed,
+        "positions_per_sec": padded / elapsed,
+        "padding_waste": 1 - real / padded if padded else 0.0,
+        "seconds": elapsed,
+    }
+
+
+def compare_padding(model, tokenizer, dataset, batch_size=16, max_length=128, max_steps=20, seed=42,
+                    warmup_steps=1):
+    """Padding waste and CPU tokens/sec for max_length padding vs. bucketed dynamic padding.
+
+    Each configuration runs warmup_steps untimed batches of its own before its
+    timed ones, so neither pays for the other's first-call overhead.
+    """
+    lengths = [len(ids) for ids in dataset["input_ids"]]
+    before_batches = random_batches(len(lengths), batch_size, seed)
+    after_batches = LengthBucketBatchSampler(lengths, batch_size, seed=seed).batches()
+
+    fixed = DataCollatorForTokenClassification(tokenizer, padding="max_length", max_length=max_length)
+    dynamic = DataCollatorForTokenClassification(tokenizer)
+
+    report = {
+        "before": {"padding_waste_epoch": padding_waste(lengths, before_batches, pad_to=max_length)},
+        "after": {"padding_waste_epoch": padding_waste(lengths, after_batches)},
+    }
+    with torch.random.fork_rng():
+        report["before"].update(measure_throughput(model, dataset, before_batches, fixed, max_steps, warmup_steps))
+        report["after"].update(measure_throughput(model, dataset, after_batches, dynamic, max_steps, warmup_steps))
+    report["speedup"] = report["after"]["tokens_per_sec"] / report["before"]["tokens_per_sec"]
+    return report
+
+
+class BucketedTrainer(Trainer):
+    """Trainer whose training batches come from LengthBucketBatchSampler.
+
+    Pair it with DataCollatorForTokenClassification so each batch is padded
+    only to its own longest example.
+    """
+
+    def __init__(self, *args, bucket_multiplier=50, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket_multiplier = bucket_multiplier
+
+    def get_train_dataloader(self):
+        train_dataset = self._remove_unused_columns(self.train_dataset, description="training")
+        lengths = [len(ids) for ids in train_dataset["input_ids"]]
+        batch_sampler = LengthBucketBatchSampler(
+            lengths,
+            self._train_batch_size,
+            bucket_multiplier=self.bucket_multiplier,
+            seed=self.args.seed,
+            drop_last=self.args.dataloader_drop_last,
+        )
+        dataloader = DataLoader(
+            train_dataset,
+            batch_sampler=batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+        )
+        return self.accelerator.prepare(dataloader)
@@ -0,0 +1,148 @@
+"""Latency and throughput of the NER model across input shapes, threads and backends.
+
+    python -m redact_demon.bench_inference --model ./pii-model --onnx ./pii-model-onnx -o bench.json
+    python -m redact_demon.bench_inference --model ./pii-model --compare bench.json
+
+Every combination of backend (torch, and the int8 ONNX export when --onnx is
+given), intra-op thread count, input length and batch size is timed through
+NerModel, the batched path behind redact_demon.redact and the server, on seeded
+synthetic text with names, emails and numbers mixed in. A row reports p50/p95/p99
+latency per batch call, texts/sec, tokens per text and the peak RSS reached
+while it ran. --compare lines the rows up with an earlier report and exits with
+status 1 if any p50/p99 or texts/sec got more than --threshold worse.
+"""
+import argparse
+import random
+import sys
+import time
+
+from redact_demon.benchmarking import PeakRSS, compare_reports, load_report, percentiles, print_regressions, write_report
+
+# Input lengths in words: a short prompt up to a multi-paragraph paste
+LENGTHS = {"prompt": 12, "sentence": 40, "paragraph": 150, "multi_paragraph": 400}
+BATCH_SIZES = (1, 8, 32)
+MIN_SECONDS = 2.0  # time each configuration for at least this long
+MIN_CALLS = 10
+ROW_KEYS = ("backend", "threads", "length", "batch_size")
+ROW_METRICS = {"p50_ms": "lower", "p99_ms": "lower", "texts_per_sec": "higher"}
+
+_WORDS = ("please", "send", "the", "report", "to", "our", "team", "before", "friday", "and", "call",
+          "me", "about", "invoice", "meeting", "with", "address", "account", "from", "client", "today")
+_NAMES = ("Alice Johnson", "Wei Chen", "Priya Natarajan", "Carlos Mendez", "Fatima Zahra", "John Smith")
+
+
+def synthetic_texts(words, count, seed=0):
+    """count texts of about `words` words each, with an entity every few words and a paragraph break every 60."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        out = []
+        for i in range(words):
+            roll = rng.random()
+            if roll < 0.06:
+                out.append(rng.choice(_NAMES))
+            elif roll < 0.08:
+                out.append(f"{rng.choice(_NAMES).split()[0].lower()}@example.com")
+            elif roll < 0.10:
+                out.append(f"{rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}")
+            else:
+                out.append(rng.choice(_WORDS))
+            if i % 60 == 59:
+                out.append("\n\n")
+        texts.append(" ".join(out))
+    return texts
+
+
+def load_backend(backend, model_path, onnx_path, threads):
+    """A NerModel for one backend, using `threads` intra-op threads."""
+    if backend == "torch":
+        import torch
+
+        from redact_demon.inference import NerModel
+
+        torch.set_num_threads(threads)
+        return NerModel.from_pretrained(model_path)
+    from redact_demon.inference import OnnxNerModel
+
+    return OnnxNerModel.from_pretrained(onnx_path, threads=threads)
+
+
+def time_config(ner, texts, batch_size, min_seconds=MIN_SECONDS, min_calls=MIN_CALLS):
+    """Time repeated ner() calls on batches drawn round-robin from texts."""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts) - batch_size + 1, batch_size)]
+    ner(batches[0], batch_size=batch_size)  # warm-up: allocator, kernels, tokenizer caches
+    timings = []
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        while len(timings) < min_calls or time.perf_counter() - started < min_seconds:
+            batch = batches[len(timings) % len(batches)]
+            call = time.perf_counter()
+            ner(batch, batch_size=batch_size)
+            timings.append(time.perf_counter() - call)
+    return {
+        **percentiles(timings),
+        "calls": len(timings),
+        "texts_per_sec": len(timings) * batch_size / sum(timings),
+        "peak_rss_mb": rss.peak_mb,
+    }
+
+
+def run(model_path, onnx_path=None, threads=(1,), lengths=tuple(LENGTHS), batch_sizes=BATCH_SIZES,
+        min_seconds=MIN_SECONDS, seed=0):
+    backends = ["torch"] + (["onnx_int8"] if onnx_path else [])
+    results = []
+    for backend in backends:
+        for n in threads:
+            ner = load_backend(backend, model_path, onnx_path, n)
+            for length in lengths:
+                texts = synthetic_texts(LENGTHS[length], 4 * max(batch_sizes), seed)
+                tokens = sum(len(ids) for ids in ner.tokenizer(texts, truncation=True, max_length=ner.max_length)["input_ids"])
+                for batch_size in batch_sizes:
+                    row = {"backend": backend, "threads": n, "length": length, "batch_size": batch_size,
+                           "words_per_text": LENGTHS[length], "tokens_per_text": tokens / len(texts)}
+                    row.update(time_config(ner, texts, batch_size, min_seconds))
+                    results.append(row)
+                    print(f"{backend:<10}{n:>3}t {length:<16}bs={batch_size:<3} p50 {row['p50_ms']:8.2f} ms  "
+                          f"p99 {row['p99_ms']:8.2f} ms  {row['texts_per_sec']:8.1f} texts/s  "
+                          f"{row['peak_rss_mb']:7.0f} MB", flush=True)
+    return results
+
+
+def _ints(value):
+    return tuple(int(v) for v in value.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NER inference latency and throughput.")
+    parser.add_argument("--model", default="./pii-model", help="trained token-classification model directory")
+    parser.add_argument("--onnx", help="directory written by redact_demon.export; adds the int8 ONNX backend")
+    parser.add_argument("--threads", type=_ints, default=(1,), help="comma-separated intra-op thread counts")
+    parser.add_argument("--lengths", default=",".join(LENGTHS), help=f"comma-separated subset of {', '.join(LENGTHS)}")
+    parser.add_argument("--batch-sizes", type=_ints, default=BATCH_SIZES, help="comma-separated batch sizes")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="time spent on each configuration")
+    parser.add_argument("-o", "--output", default="bench_inference.json", help="JSON report to write")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    # Read before the run: --output may be the same file and is overwritten below
+    baseline = load_report(args.compare) if args.compare else None
+
+    lengths = tuple(args.lengths.split(","))
+    unknown = [length for length in lengths if length not in LENGTHS]
+    if unknown:
+        parser.error(f"unknown length(s) {', '.join(unknown)}; choose from {', '.join(LENGTHS)}")
+
+    results = run(args.model, args.onnx, args.threads, lengths, args.batch_sizes, args.min_seconds)
+    report = write_report(args.output, results, model=args.model, onnx=args.onnx)
+    print(f"Wrote {len(results)} rows to {args.output}")
+
+    if args.compare:
+        regressions = compare_reports(baseline, report, ROW_KEYS, ROW_METRICS, args.threshold)
+        print_regressions(regressions, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
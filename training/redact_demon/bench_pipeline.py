@@ -0,0 +1,307 @@
+"""Throughput, memory and scaling of each synthetic-data pipeline stage.
+
+    python -m redact_demon.bench_pipeline -o bench_pipeline.json
+    python -m redact_demon.bench_pipeline --stages sg_name,sentence_to_conll --sizes 1000,10000,100000
+
+Each stage calls the core function of one data module under "training data" on
+seeded inputs drawn from the CSVs checked in there (names, scraped and
+augmented addresses), at several input sizes. Inputs are built before the
+clock starts, and every run reseeds, so repeats do the same work.
+
+Per stage and size a row reports rows/sec (best of --repeats runs) and peak RSS
+while timing. A separate run under tracemalloc gives the peak bytes allocated
+by Python code and how many allocated blocks are still alive afterwards;
+tracing slows everything down, so those runs are never timed. The time-vs-size
+exponent of each stage is fitted on a log-log scale; an exponent above
+1 + --superlinear-slack is flagged, as such a stage gets slower per row the
+bigger the corpus. --compare checks rows/sec and allocation peaks against an
+earlier report, like redact_demon.bench_inference.
+"""
+import argparse
+import gc
+import importlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from redact_demon.benchmarking import PeakRSS, compare_reports, load_report, print_regressions, write_report
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "training data")
+SIZES = (1_000, 4_000, 16_000)
+REPEATS = 3
+SUPERLINEAR_SLACK = 0.15  # fitted exponent allowed above 1 before a stage is flagged
+ROW_KEYS = ("stage", "size")
+ROW_METRICS = {"rows_per_sec": "higher", "traced_peak_mb": "lower"}
+
+
+def _script(name):
+    """Import one of the data modules from the generate_data or process_data package."""
+    if DATA_DIR not in sys.path:
+        sys.path.insert(0, DATA_DIR)
+    for package in ("generate_data", "process_data"):
+        if os.path.exists(os.path.join(DATA_DIR, package, name + ".py")):
+            return importlib.import_module(f"{package}.{name}")
+    raise ImportError(f"no data module named {name}")
+
+
+def _column(csv_name, column):
+    import pandas as pd
+
+    return pd.read_csv(os.path.join(DATA_DIR, csv_name))[column].dropna().astype(str).tolist()
+
+
+# --- STAGES ---
+# Each builder takes (size, seed) and returns a zero-argument function doing the
+# stage's work on `size` input rows; loading and sampling happen in the builder.
+def _sg_name(size, seed):
+    generate_name = _script("generate_name")
+
+    def work():
+        random.seed(seed)
+        return [generate_name.sg_name() for _ in range(size)]
+    return work
+
+
+def _sg_names_batch(size, seed):
+    generate_name = _script("generate_name")
+    tables = generate_name.NameTables()
+    return lambda: generate_name.sg_names_batch(size, np.random.default_rng(seed), tables)
+
+
+def _streets(size, seed):
+    import pandas as pd
+
+    rows = pd.read_csv(os.path.join(DATA_DIR, "addresses.csv")).sample(size, replace=True, random_state=seed)
+    return rows["street"].tolist(), rows["zip_code"].tolist()
+
+
+def _augment_address(size, seed):
+    format_address = _script("format_address")
+    streets, zip_codes = _streets(size, seed)
+
+    def work():
+        random.seed(seed)
+        return [format_address.augment_address(street, zip_code) for street, zip_code in zip(streets, zip_codes)]
+    return work
+
+
+def _augment_addresses_batch(size, seed):
+    format_address = _script("format_address")
+    streets, zip_codes = _streets(size, seed)
+    return lambda: format_address.augment_addresses_batch(streets, zip_codes, np.random.default_rng(seed), variants=1)
+
+
+def _address_to_conll(size, seed):
+    address_to_conll = _script("address_to_CoNLL")
+    addresses = random.Random(seed).choices(_column("augmented_addresses.csv", "augmented"), k=size)
+
+    def work():
+        random.seed(seed)
+        return [address_to_conll.address_to_conll(address) for address in addresses]
+    return work
+
+
+def _addresses_to_conll_batch(size, seed):
+    address_to_conll = _script("address_to_CoNLL")
+    addresses = random.Random(seed).choices(_column("augmented_addresses.csv", "augmented"), k=size)
+
+    def work():
+        random.seed(seed)
+        return list(address_to_conll.addresses_to_conll(addresses))
+    return work
+
+
+def _name_to_conll(size, seed):
+    name_to_conll = _script("name_to_CoNLL")
+    names = random.Random(seed).choices(_column("sg_names.csv", "name"), k=size)
+
+    def work():
+        random.seed(seed)
+        return [name_to_conll.template_to_conll_lines(*s) for s in name_to_conll.make_sentences(names)]
+    return work
+
+
+def _sentence_to_conll(size, seed):
+    combine = _script("combine_name_address")
+    names = _column("sg_names.csv", "name")
+    addresses = _column("augmented_addresses.csv", "augmented")
+    combos = [(scenario, ttype) for scenario in combine.SCENARIOS for ttype in combine.TYPES]
+
+    def work():
+        rng = random.Random(seed)
+        out = []
+        for i, (scenario, ttype) in enumerate(combos):
+            count = size // len(combos) + (i < size % len(combos))
+            out.extend(combine.generate_combo(names, addresses, scenario, ttype, count, rng))
+        return out
+    return work
+
+
+def _sentence_to_conll_planned(size, seed):
+    combine = _script("combine_name_address")
+    names = _column("sg_names.csv", "name")
+    addresses = _column("augmented_addresses.csv", "augmented")
+    per_combo = max(1, size // (len(combine.SCENARIOS) * len(combine.TYPES)))
+
+    def work():
+        out = []
+        for task in combine.plan_corpus(len(names), len(addresses), per_combo, seed):
+            out.extend(combine.generate_planned(names, addresses, *task))
+        return out
+    return work
+
+
+def _sampling_plan(size, seed):
+    combine = _script("combine_name_address")
+    per_combo = max(1, size // (len(combine.SCENARIOS) * len(combine.TYPES)))
+    num_names, num_addresses = len(_column("sg_names.csv", "name")), len(_column("augmented_addresses.csv", "augmented"))
+    return lambda: list(combine.plan_corpus(num_names, num_addresses, per_combo, seed))
+
+
+def _dedup(size, seed):
+    dedup = _script("dedup")
+    # About one sentence in four repeats an earlier one
+    pool = _sentence_to_conll(max(1, size * 3 // 4), seed)()
+    sentences = random.Random(seed).choices(pool, k=size)
+    return lambda: list(dedup.Deduplicator(dedup.make_index("exact")).filter(sentences))
+
+
+STAGES = {
+    "sg_name": _sg_name,
+    "sg_names_batch": _sg_names_batch,
+    "augment_address": _augment_address,
+    "augment_addresses_batch": _augment_addresses_batch,
+    "address_to_conll": _address_to_conll,
+    "addresses_to_conll_batch": _addresses_to_conll_batch,
+    "name_to_conll": _name_to_conll,
+    "sentence_to_conll": _sentence_to_conll,
+    "sentence_to_conll_planned": _sentence_to_conll_planned,
+    "sampling_plan": _sampling_plan,
+    "dedup": _dedup,
+}
+
+
+# --- MEASUREMENT ---
+def measure(work, size, repeats=REPEATS):
+    """Best-of-repeats rows/sec and peak RSS, then one traced run for allocations."""
+    work()  # warm-up: imports, regex and Faker caches
+    timings = []
+    with PeakRSS() as rss:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = work()
+            timings.append(time.perf_counter() - started)
+            del result
+    seconds = min(timings)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = work()
+    _, peak = tracemalloc.get_traced_memory()
+    # Only what outlives the output counts: free it and tracemalloc's own bookkeeping first
+    del result
+    tracemalloc.stop()
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks
+    return {
+        "seconds": seconds,
+        "rows_per_sec": size / seconds,
+        "peak_rss_mb": rss.peak_mb,
+        "traced_peak_mb": peak / 1e6,
+        "traced_bytes_per_row": peak / size,
+        "retained_blocks": retained,
+    }
+
+
+def scaling_exponent(sizes, seconds):
+    """Slope of log(seconds) over log(size): 1 is linear, 2 quadratic."""
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def run(stages=tuple(STAGES), sizes=SIZES, repeats=REPEATS, seed=0, slack=SUPERLINEAR_SLACK):
+    """Result rows per (stage, size) and {stage: scaling summary}."""
+    results, scaling = [], {}
+    for stage in stages:
+        rows = []
+        for size in sizes:
+            try:
+                work = STAGES[stage](size, seed)
+                row = {"stage": stage, "size": size, **measure(work, size, repeats)}
+            except (ImportError, LookupError) as error:  # missing package or NLTK data
+                # NLTK frames its message in lines of asterisks; keep the first line with words
+                reason = next((line.strip() for line in str(error).splitlines() if line.strip(" *")), "")
+                scaling[stage] = {"skipped": f"{type(error).__name__}: {reason}"}
+                print(f"{stage:<24} skipped ({scaling[stage]['skipped']})", flush=True)
+                break
+            rows.append(row)
+            print(f"{stage:<24}{size:>9,} rows {row['rows_per_sec']:>12,.0f} rows/s "
+                  f"{row['traced_peak_mb']:>9.1f} MB traced {row['peak_rss_mb']:>8.0f} MB RSS", flush=True)
+        else:
+            exponent = scaling_exponent([r["size"] for r in rows], [r["seconds"] for r in rows])
+            scaling[stage] = {
+                "exponent": exponent,
+                "superlinear": exponent is not None and exponent > 1 + slack,
+                "rows_per_sec_at_max": rows[-1]["rows_per_sec"],
+            }
+        results.extend(rows)
+    return results, scaling
+
+
+def print_summary(scaling):
+    measured = {stage: s for stage, s in scaling.items() if "exponent" in s}
+    print(f"\n{'stage':<24}{'exponent':>9}{'rows/s at max size':>20}")
+    for stage, s in sorted(measured.items(), key=lambda item: item[1]["rows_per_sec_at_max"]):
+        exponent = "n/a" if s["exponent"] is None else f"{s['exponent']:.2f}"
+        flag = "  SUPERLINEAR" if s["superlinear"] else ""
+        print(f"{stage:<24}{exponent:>9}{s['rows_per_sec_at_max']:>20,.0f}{flag}")
+    if measured:
+        slowest = min(measured, key=lambda stage: measured[stage]["rows_per_sec_at_max"])
+        print(f"Slowest stage per row: {slowest}")
+
+
+def _ints(value):
+    return tuple(int(v) for v in value.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the synthetic-data pipeline stages.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--sizes", type=_ints, default=SIZES, help="comma-separated input sizes, in rows")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="timed runs per size; the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--superlinear-slack", type=float, default=SUPERLINEAR_SLACK,
+                        help="flag stages whose time grows faster than size**(1 + slack)")
+    parser.add_argument("-o", "--output", default="bench_pipeline.json", help="JSON report to write")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    # Read before the run: --output may be the same file and is overwritten below
+    baseline = load_report(args.compare) if args.compare else None
+
+    stages = tuple(args.stages.split(","))
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+
+    results, scaling = run(stages, sorted(args.sizes), args.repeats, args.seed, args.superlinear_slack)
+    print_summary(scaling)
+    report = write_report(args.output, results, seed=args.seed, repeats=args.repeats, scaling=scaling)
+    print(f"Wrote {len(results)} rows to {args.output}")
+
+    if args.compare:
+        regressions = compare_reports(baseline, report, ROW_KEYS, ROW_METRICS, args.threshold)
+        print_regressions(regressions, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Shared plumbing for the benchmark suites: run metadata, memory sampling and JSON reports.
+
+A report is {"meta": {...}, "results": [{...}, ...]}. Each result row carries
+the parameters that identify it (backend, batch size, stage, ...) next to its
+measurements, so two reports from different commits can be lined up row by
+row with compare_reports and any metric that got worse by more than a
+threshold is listed.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # fall back to /proc or getrusage, no extra dependency
+    psutil = None
+
+SAMPLE_INTERVAL = 0.005  # seconds between RSS samples
+
+
+def environment():
+    """What a benchmark number depends on besides the code: commit, versions and CPU."""
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10,
+        )
+        if commit.returncode == 0:
+            meta["commit"] = commit.stdout.strip()
+    except OSError:
+        pass
+    for module in ("numpy", "torch", "transformers", "onnxruntime"):
+        if module in sys.modules:
+            meta[module] = getattr(sys.modules[module], "__version__", None)
+    return meta
+
+
+def percentiles(seconds, points=(50, 95, 99)):
+    """{"p50_ms": ..., ...} for a list of durations in seconds."""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    return {f"p{p}_ms": float(np.percentile(ms, p)) if len(ms) else 0.0 for p in points}
+
+
+def rss_mb():
+    """Resident set size of this process in MB.
+
+    Without psutil it is read from /proc/self/statm on Linux; elsewhere only
+    ru_maxrss is available, which is the peak so far rather than the current size.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / 1e6 if sys.platform == "darwin" else max_rss * 1024 / 1e6  # bytes on macOS, KiB elsewhere
+
+
+class PeakRSS:
+    """Context manager sampling this process's resident set size on a background thread.
+
+    ru_maxrss only ever grows over the process lifetime; sampling gives the
+    peak of each measured block on its own.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def __enter__(self):
+        self.peak_mb = rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, rss_mb())
+
+
+# --- REPORTS ---
+def write_report(path, results, **meta):
+    report = {"meta": {**environment(), **meta}, "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(baseline, current, keys, metrics, threshold=0.1):
+    """Rows whose metrics got worse than baseline by more than threshold (a fraction).
+
+    keys are the fields identifying a row; metrics maps each compared field to
+    "lower" or "higher", whichever is better. Rows missing from either report
+    are skipped.
+    """
+    def key(row):
+        return tuple(row.get(k) for k in keys)
+
+    before = {key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old is None:
+            continue
+        for metric, better in metrics.items():
+            if not old.get(metric) or metric not in row:
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            if (change if better == "lower" else -change) > threshold:
+                regressions.append({
+                    **{k: row.get(k) for k in keys},
+                    "metric": metric, "baseline": old[metric], "current": row[metric], "change": change,
+                })
+    return regressions
+
+
+def print_regressions(regressions, threshold):
+    if not regressions:
+        print(f"No metric regressed by more than {threshold:.0%} against the baseline.")
+        return
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:")
+    for r in regressions:
+        where = ", ".join(f"{k}={v}" for k, v in r.items() if k not in ("metric", "baseline", "current", "change"))
+        print(f"  {where}: {r['metric']} {r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%})")
@@ -0,0 +1,159 @@
+"""Content-addressed cache of the tokenized, label-aligned dataset.
+
+The cache key is a hash of everything the tokenized output depends on: the
+corpus bytes, the tokenizer (class plus its full serialized vocab and
+normalization config), the label map, max_length and any split parameters.
+Change any of them and a new entry is built; otherwise a repeat run loads the
+aligned dataset from disk with load_from_disk.
+"""
+import hashlib
+import json
+import os
+import shutil
+from itertools import chain
+
+import numpy as np
+
+CACHE_DIR = "_tokenized_cache"
+IGNORE_INDEX = -100  # label of special tokens, skipped by the loss
+HASH_CHUNK = 1 << 20
+DATASETS_CACHE_PREFIX = "cache-"  # index files datasets writes next to a memory-mapped corpus.arrow
+
+
+# --- KEYS ---
+def file_digest(path, digest=None):
+    """blake2b of a file, or of every file under a directory in sorted order.
+
+    datasets' own cache files in a directory are skipped: splitting a corpus
+    writes them, and they are derived from it, not part of it.
+    """
+    digest = digest or hashlib.blake2b(digest_size=16)
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.startswith(DATASETS_CACHE_PREFIX) and name.endswith(".arrow"):
+                continue
+            digest.update(name.encode("utf-8"))
+            file_digest(os.path.join(path, name), digest)
+        return digest
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest
+
+
+def tokenizer_digest(tokenizer):
+    """Hash of the tokenizer's class, vocab and pre/post-processing config."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(type(tokenizer).__name__.encode("utf-8"))
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        digest.update(backend.to_str().encode("utf-8"))
+    else:
+        digest.update(json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(source, tokenizer, label2id, max_length, **params):
+    """Key of one tokenized dataset: corpus bytes + tokenizer + label map + settings."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(file_digest(source).digest())
+    digest.update(tokenizer_digest(tokenizer).encode("utf-8"))
+    digest.update(json.dumps({"label2id": label2id, "max_length": max_length, **params}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# --- ALIGNMENT ---
+def align_labels(word_ids, tags, label2id):
+    """Label every subword with the tag of the word it came from, -100 for special tokens.
+
+    word_ids holds one word_ids() list per example (None for special tokens),
+    tags the matching word-level tag lists. Both are flattened once and the
+    alignment is a single gather over the batch.
+    """
+    if not word_ids:
+        return []
+    lengths = np.fromiter((len(w) for w in word_ids), dtype=np.int64, count=len(word_ids))
+    flat_words = np.array(list(chain.from_iterable(word_ids)), dtype=np.float64)  # None -> nan
+    special = np.isnan(flat_words)
+
+    tag_lengths = np.fromiter((len(t) for t in tags), dtype=np.int64, count=len(tags))
+    tag_starts = np.cumsum(tag_lengths) - tag_lengths
+    flat_tags = np.fromiter(map(label2id.__getitem__, chain.from_iterable(tags)), dtype=np.int64,
+                            count=int(tag_lengths.sum()))
+
+    positions = np.repeat(tag_starts, lengths) + np.where(special, 0, flat_words).astype(np.int64)
+    labels = np.full(len(flat_words), IGNORE_INDEX, dtype=np.int64)
+    labels[~special] = flat_tags[positions[~special]]
+
+    # Slicing one Python list is cheaper than splitting the array and converting every piece
+    labels = labels.tolist()
+    ends = np.cumsum(lengths).tolist()
+    return [labels[end - n:end] for end, n in zip(ends, lengths.tolist())]
+
+
+def tokenize_and_align_labels(examples, tokenizer, label2id, max_length=128, vocab=None, labels=None):
+    """Batched map function: tokenize pre-split words and attach aligned labels.
+
+    Examples hold either tokens/ner_tags strings or, as redact_demon.corpus
+    datasets do, token_ids/tag_ids; those are looked up in the corpus vocab
+    and labels here, one batch at a time.
+    """
+    if "token_ids" in examples:
+        words = [[vocab[i] for i in ids] for ids in examples["token_ids"]]
+        tags = [[labels[i] for i in ids] for ids in examples["tag_ids"]]
+    else:
+        words, tags = examples["tokens"], examples["ner_tags"]
+    tokenized_inputs = tokenizer(
+        words,
+        truncation=True,
+        is_split_into_words=True,
+        max_length=max_length,
+    )
+    if tokenized_inputs.encodings is not None:
+        # Fast tokenizers: read word ids off the Rust encodings, skipping the per-call BatchEncoding checks
+        word_ids = [encoding.word_ids for encoding in tokenized_inputs.encodings]
+    else:
+        word_ids = [tokenized_inputs.word_ids(batch_index=i) for i in range(len(words))]
+    tokenized_inputs["labels"] = align_labels(word_ids, tags, label2id)
+    return tokenized_inputs
+
+
+# --- CACHE ---
+def cached_tokenize(dataset, tokenizer, label2id, source, max_length=128, cache_dir=CACHE_DIR, **params):
+    """Tokenize and align `dataset` (Dataset or DatasetDict), reusing a cached copy if one exists.
+
+    `source` is the corpus file or directory the dataset was built from; extra
+    keyword arguments (e.g. the split seed) are folded into the key as well.
+    A dataset of token_ids/tag_ids is decoded with the vocab of the
+    redact_demon.corpus directory at `source`.
+    """
+    from datasets import load_from_disk
+
+    fn_kwargs = {"tokenizer": tokenizer, "label2id": label2id, "max_length": max_length}
+    columns = dataset.column_names
+    if isinstance(columns, dict):  # DatasetDict: one list per split
+        columns = next(iter(columns.values()), [])
+    if "token_ids" in columns:
+        from redact_demon.corpus import load_corpus
+
+        corpus = load_corpus(source)
+        fn_kwargs.update(vocab=corpus.vocab, labels=corpus.labels)
+
+    key = cache_key(source, tokenizer, label2id, max_length, **params)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(path):
+        print(f"Loading tokenized dataset from cache {path}")
+        return load_from_disk(path)
+
+    tokenized = dataset.map(
+        tokenize_and_align_labels,
+        batched=True,
+        fn_kwargs=fn_kwargs,
+    )
+    # Write under a temporary name and rename, so an interrupted run never leaves a half entry
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tokenized.save_to_disk(tmp_path)
+    os.replace(tmp_path, path)
+    print(f"Cached tokenized dataset at {path}")
+    return load_from_disk(path)
@@ -0,0 +1,218 @@
+"""Binary, memory-mapped CoNLL corpus.
+
+A converted corpus is a directory of flat arrays plus two small JSON files:
+
+    tokens.bin   int32  token id of every token, sentences back to back
+    labels.bin   int16  label id of every token
+    offsets.bin  int64  start of sentence i is offsets[i], end is offsets[i + 1]
+    vocab.json          token strings, indexed by token id
+    meta.json           label names, dtypes and counts
+    corpus.arrow        the same ids as token_ids/tag_ids list columns (Arrow IPC stream)
+
+Loading memory-maps the arrays, so opening a multi-GB corpus is instant and a
+sentence is two array slices instead of parsed text. to_dataset opens
+corpus.arrow with Dataset.from_file, which memory-maps it too: the dataset
+holds ids, and tokenize_and_align_labels in redact_demon.cache looks the words
+up in vocab.json batch by batch. Decoding every token to a string up front is
+opt-in (decode=True) and builds the whole corpus in memory.
+"""
+import argparse
+import json
+import os
+from array import array
+
+import numpy as np
+
+TOKEN_DTYPE = np.int32
+LABEL_DTYPE = np.int16
+OFFSET_DTYPE = np.int64
+FLUSH_TOKENS = 1 << 20  # tokens buffered before each write to disk
+ARROW_FILE = "corpus.arrow"
+ARROW_BATCH = 1 << 16  # sentences per record batch of corpus.arrow
+
+
+def iter_conll(path, label_column=1):
+    """Yield (tokens, tags) per sentence of a whitespace-separated CoNLL file.
+
+    Handles both the two-column name/address files and the three-column
+    (token, tag, PII flag) output of combine_name_address.py.
+    """
+    tokens, tags = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            columns = line.split()
+            if not columns:  # sentence boundary
+                if tokens:
+                    yield tokens, tags
+                    tokens, tags = [], []
+                continue
+            if len(columns) <= label_column:
+                # In case some line is malformed
+                continue
+            tokens.append(columns[0])
+            tags.append(columns[label_column])
+    # Catch last sentence if file doesn't end with a blank line
+    if tokens:
+        yield tokens, tags
+
+
+def convert_conll(paths, out_dir, label_column=1):
+    """Stream one or more CoNLL files into a binary corpus directory and return it loaded."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    os.makedirs(out_dir, exist_ok=True)
+
+    vocab, label_ids = {}, {}
+    token_buf, label_buf, offset_buf = array("i"), array("h"), array("q", [0])
+    num_tokens = num_sentences = 0
+
+    with open(os.path.join(out_dir, "tokens.bin"), "wb") as tok_f, \
+            open(os.path.join(out_dir, "labels.bin"), "wb") as lab_f, \
+            open(os.path.join(out_dir, "offsets.bin"), "wb") as off_f:
+
+        def flush():
+            token_buf.tofile(tok_f)
+            label_buf.tofile(lab_f)
+            offset_buf.tofile(off_f)
+            del token_buf[:], label_buf[:], offset_buf[:]
+
+        for path in paths:
+            for tokens, tags in iter_conll(path, label_column):
+                token_buf.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+                label_buf.extend(label_ids.setdefault(t, len(label_ids)) for t in tags)
+                num_tokens += len(tokens)
+                num_sentences += 1
+                offset_buf.append(num_tokens)
+                if len(token_buf) >= FLUSH_TOKENS:
+                    flush()
+        flush()
+
+    with open(os.path.join(out_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(list(vocab), f, ensure_ascii=False)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "labels": list(label_ids),
+            "num_sentences": num_sentences,
+            "num_tokens": num_tokens,
+            "token_dtype": np.dtype(TOKEN_DTYPE).name,
+            "label_dtype": np.dtype(LABEL_DTYPE).name,
+            "offset_dtype": np.dtype(OFFSET_DTYPE).name,
+            "sources": [os.path.basename(str(p)) for p in paths],
+        }, f, ensure_ascii=False, indent=2)
+
+    corpus = Corpus(out_dir)
+    corpus.write_arrow()
+    return corpus
+
+
+class Corpus:
+    """Read-only view of a converted corpus; every array is memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        self.labels = self.meta["labels"]
+        self.token_ids = self._map("tokens.bin", self.meta["token_dtype"])
+        self.label_ids = self._map("labels.bin", self.meta["label_dtype"])
+        self.offsets = self._map("offsets.bin", self.meta["offset_dtype"])
+
+    def _map(self, name, dtype):
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def sentence_ids(self, i):
+        """Zero-copy (token_ids, label_ids) slices of sentence i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.token_ids[start:end], self.label_ids[start:end]
+
+    def __getitem__(self, i):
+        token_ids, label_ids = self.sentence_ids(i)
+        return {
+            "tokens": [self.vocab[t] for t in token_ids],
+            "ner_tags": [self.labels[t] for t in label_ids],
+        }
+
+    def decode(self, token_ids):
+        """Words of a sequence of token ids."""
+        return [self.vocab[t] for t in token_ids]
+
+    def to_arrow(self, decode=False):
+        """Arrow table with `token_ids` and `tag_ids` list columns built over the mapped arrays.
+
+        The id and offset buffers are shared with the memory map, nothing is
+        copied. decode=True returns `tokens` and `ner_tags` string columns
+        instead, which expands every token into a new in-memory buffer.
+        """
+        import pyarrow as pa
+
+        offsets = pa.array(np.asarray(self.offsets))
+        token_ids, label_ids = pa.array(np.asarray(self.token_ids)), pa.array(np.asarray(self.label_ids))
+        if not decode:
+            return pa.table({
+                "token_ids": pa.LargeListArray.from_arrays(offsets, token_ids),
+                # Not "label_ids": Trainer keeps that name as a label column and hands it to the collator
+                "tag_ids": pa.LargeListArray.from_arrays(offsets, label_ids),
+            })
+        tokens = pa.DictionaryArray.from_arrays(token_ids, pa.array(self.vocab, pa.string())).dictionary_decode()
+        tags = pa.DictionaryArray.from_arrays(label_ids, pa.array(self.labels, pa.string())).dictionary_decode()
+        return pa.table({
+            "tokens": pa.LargeListArray.from_arrays(offsets, tokens),
+            "ner_tags": pa.LargeListArray.from_arrays(offsets, tags),
+        })
+
+    @property
+    def arrow_path(self):
+        return os.path.join(self.path, ARROW_FILE)
+
+    def write_arrow(self):
+        """Write the id columns to corpus.arrow, streaming record batches out of the memory map."""
+        import pyarrow as pa
+
+        table = self.to_arrow()
+        tmp_path = f"{self.arrow_path}.tmp-{os.getpid()}"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=ARROW_BATCH)
+        os.replace(tmp_path, self.arrow_path)
+
+    def to_dataset(self, decode=False):
+        """Hugging Face Dataset of the corpus, memory-mapped from corpus.arrow.
+
+        Its columns are token_ids and tag_ids; decode=True gives the
+        tokens/ner_tags strings read_conll produced, built in memory.
+        """
+        from datasets import Dataset
+
+        if decode:
+            return Dataset(self.to_arrow(decode=True))
+        # Corpora converted before corpus.arrow existed get it on first use
+        if not os.path.exists(self.arrow_path):
+            self.write_arrow()
+        return Dataset.from_file(self.arrow_path)
+
+
+def load_corpus(path):
+    return Corpus(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CoNLL text files into a memory-mapped binary corpus.")
+    parser.add_argument("inputs", nargs="+", help="CoNLL files, concatenated in order")
+    parser.add_argument("--output", required=True, help="corpus directory to create")
+    parser.add_argument("--label-column", type=int, default=1, help="column holding the NER tag")
+    args = parser.parse_args()
+
+    corpus = convert_conll(args.inputs, args.output, args.label_column)
+    print(f"Wrote {len(corpus)} sentences, {corpus.meta['num_tokens']} tokens, "
+          f"{len(corpus.vocab)} token types and {len(corpus.labels)} labels to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
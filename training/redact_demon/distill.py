@@ -0,0 +1,313 @@
+"""Distil the fine-tuned PII model into smaller, faster students on CPU.
+
+    python -m redact_demon.distill --teacher ./pii-model --corpus <corpus_dir> --students 3,2x384,4x256
+
+A student is the teacher's architecture with fewer layers and/or a narrower
+hidden size ("LAYERS" or "LAYERSxHIDDEN"). Students as wide as the teacher
+start from its embeddings and an evenly spaced subset of its layers; narrower
+ones start from scratch. Each is trained on the teacher's softened token
+logits (KL divergence at --temperature) mixed with the usual cross-entropy on
+the CoNLL labels (--alpha weights the soft part), over the same tokenized
+corpus and length-bucketed batches as the notebook's Trainer.
+
+The teacher runs once over the training split and its logits are stored with
+the dataset, so several students and epochs cost no extra teacher passes. The
+report lists parameters, seqeval F1 on the validation split, CPU latency and
+speedup over the teacher for every student, and recommends the fastest one
+within --max-f1-drop of the teacher.
+"""
+import argparse
+import copy
+import json
+import os
+import re
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import DataCollatorForTokenClassification, TrainingArguments
+
+from redact_demon.batching import BucketedTrainer
+from redact_demon.cache import IGNORE_INDEX
+from redact_demon.inference import NerModel
+
+TEMPERATURE = 2.0
+ALPHA = 0.5  # weight of the soft-target loss; 1 - ALPHA goes to the hard labels
+HEAD_SIZE = 64  # hidden units per attention head in students
+MAX_F1_DROP = 0.02
+LATENCY_SAMPLE = 500  # validation sentences timed per model
+
+# Config attributes for depth, width, feed-forward width and heads, by model family
+_DIMENSIONS = {
+    "distilbert": ("n_layers", "dim", "hidden_dim", "n_heads"),
+    "default": ("num_hidden_layers", "hidden_size", "intermediate_size", "num_attention_heads"),
+}
+_LAYER_KEY = re.compile(r"\.layer\.(\d+)\.")
+
+
+# --- STUDENTS ---
+def _dimension_names(config):
+    return _DIMENSIONS.get(config.model_type, _DIMENSIONS["default"])
+
+
+def parse_spec(spec):
+    """Student spec to (layers, hidden size): "4" -> (4, None), "4x384" -> (4, 384)."""
+    layers, _, hidden = spec.partition("x")
+    return int(layers), int(hidden) if hidden else None
+
+
+def student_config(teacher_config, num_layers, hidden_size=None):
+    """Teacher config with fewer layers and, optionally, a narrower hidden size."""
+    layers_attr, hidden_attr, ffn_attr, heads_attr = _dimension_names(teacher_config)
+    config = copy.deepcopy(teacher_config)
+    setattr(config, layers_attr, num_layers)
+    if hidden_size and hidden_size != getattr(teacher_config, hidden_attr):
+        ratio = getattr(teacher_config, ffn_attr) / getattr(teacher_config, hidden_attr)
+        setattr(config, hidden_attr, hidden_size)
+        setattr(config, ffn_attr, int(hidden_size * ratio))
+        setattr(config, heads_attr, max(1, hidden_size // HEAD_SIZE))
+    return config
+
+
+def make_student(teacher, num_layers, hidden_size=None):
+    """New student model; copies embeddings and spaced-out layers when the width allows."""
+    from transformers import AutoModelForTokenClassification
+
+    config = student_config(teacher.config, num_layers, hidden_size)
+    student = AutoModelForTokenClassification.from_config(config)
+    _, hidden_attr, _, _ = _dimension_names(config)
+    if getattr(config, hidden_attr) != getattr(teacher.config, hidden_attr):
+        return student
+
+    layers_attr = _dimension_names(config)[0]
+    keep = np.linspace(0, getattr(teacher.config, layers_attr) - 1, num_layers).round().astype(int)
+    source = {int(teacher_layer): i for i, teacher_layer in enumerate(keep)}
+    state = {}
+    for key, value in teacher.state_dict().items():
+        match = _LAYER_KEY.search(key)
+        if match is None:
+            state[key] = value
+        elif int(match.group(1)) in source:
+            state[_LAYER_KEY.sub(f".layer.{source[int(match.group(1))]}.", key, count=1)] = value
+    student.load_state_dict(state)
+    return student
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+# --- TEACHER TARGETS ---
+def add_teacher_logits(teacher, tokenizer, dataset, batch_size=64):
+    """Copy of a tokenized dataset with the teacher's per-token logits as a `teacher_logits` column."""
+    ner = NerModel(teacher, tokenizer)
+    lengths = [len(ids) for ids in dataset["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+    logits = [None] * len(lengths)
+    for b in range(0, len(order), batch_size):
+        indices = order[b:b + batch_size].tolist()
+        rows = dataset[indices]
+        batch = tokenizer.pad(
+            {"input_ids": rows["input_ids"], "attention_mask": rows["attention_mask"]}, return_tensors="pt"
+        )
+        out = ner.logits(batch)
+        # Left padding puts the tokens at the end of each row
+        left = tokenizer.padding_side == "left"
+        for row, i in zip(out, indices):
+            logits[i] = (row[len(row) - lengths[i]:] if left else row[:lengths[i]]).tolist()
+    return dataset.add_column("teacher_logits", logits)
+
+
+class DistillationCollator(DataCollatorForTokenClassification):
+    """DataCollatorForTokenClassification that also pads `teacher_logits` to the batch width."""
+
+    def __call__(self, features, return_tensors=None):
+        teacher = [feature["teacher_logits"] for feature in features] if "teacher_logits" in features[0] else None
+        features = [{k: v for k, v in feature.items() if k != "teacher_logits"} for feature in features]
+        batch = super().__call__(features, return_tensors)
+        if teacher is not None:
+            width = batch["input_ids"].shape[1]
+            padded = torch.zeros(len(teacher), width, len(teacher[0][0]))
+            for i, logits in enumerate(teacher):
+                logits = torch.as_tensor(logits, dtype=torch.float32)
+                if self.tokenizer.padding_side == "left":
+                    padded[i, width - len(logits):] = logits
+                else:
+                    padded[i, :len(logits)] = logits
+            batch["teacher_logits"] = padded
+        return batch
+
+
+class DistillationTrainer(BucketedTrainer):
+    """BucketedTrainer whose loss mixes KL to the teacher's soft targets with label cross-entropy."""
+
+    def __init__(self, *args, temperature=TEMPERATURE, alpha=ALPHA, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def _set_signature_columns_if_needed(self):
+        # Keep teacher_logits, which the model's forward does not take, in the training data
+        super()._set_signature_columns_if_needed()
+        if "teacher_logits" not in self._signature_columns:
+            self._signature_columns.append("teacher_logits")
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        teacher_logits = inputs.pop("teacher_logits")
+        outputs = model(**inputs)
+        mask = inputs["labels"] != IGNORE_INDEX
+        t = self.temperature
+        soft = F.kl_div(
+            F.log_softmax(outputs.logits[mask] / t, dim=-1),
+            F.softmax(teacher_logits[mask].to(outputs.logits.dtype) / t, dim=-1),
+            reduction="batchmean",
+        ) * t * t
+        loss = self.alpha * soft + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+def distill(tokenizer, student, train_dataset, output_dir, epochs=3, batch_size=16,
+            learning_rate=1e-4, temperature=TEMPERATURE, alpha=ALPHA, seed=42):
+    """Train student on train_dataset (with teacher_logits) on CPU and save it with the tokenizer."""
+    args = TrainingArguments(
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=batch_size,
+        learning_rate=learning_rate,
+        save_strategy="no",
+        logging_steps=50,
+        report_to=[],
+        seed=seed,
+        use_cpu=True,
+    )
+    trainer = DistillationTrainer(
+        model=student,
+        args=args,
+        train_dataset=train_dataset,
+        data_collator=DistillationCollator(tokenizer),
+        temperature=temperature,
+        alpha=alpha,
+    )
+    trainer.train()
+    trainer.save_model(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return student
+
+
+# --- REPORT ---
+def _scores(model, tokenizer, validation, texts):
+    from redact_demon.export import evaluate_f1, measure_latency
+
+    ner = NerModel(model, tokenizer)
+    return {
+        "parameters": count_parameters(model),
+        **evaluate_f1(ner, validation),
+        **measure_latency(ner, texts),
+    }
+
+
+def distill_students(teacher_path, specs, tokenized, output_root, epochs=3, batch_size=16, learning_rate=1e-4,
+                     temperature=TEMPERATURE, alpha=ALPHA, max_f1_drop=MAX_F1_DROP, seed=42, texts=None):
+    """Distil one student per spec; return the accuracy-vs-latency report (also saved as JSON).
+
+    `tokenized` is the notebook's DatasetDict with "train" and "validation"
+    splits, tokenized with the teacher's tokenizer; `texts` are the plain
+    sentences timed for latency (by default, the first validation sentences).
+    """
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    teacher = AutoModelForTokenClassification.from_pretrained(teacher_path).eval()
+    tokenizer = AutoTokenizer.from_pretrained(teacher_path)
+    validation = tokenized["validation"]
+    if texts is None:
+        sample = validation.select(range(min(LATENCY_SAMPLE, len(validation))))
+        if "tokens" in sample.column_names:
+            texts = [" ".join(tokens) for tokens in sample["tokens"]]
+        else:  # redact_demon.corpus datasets carry ids only
+            texts = tokenizer.batch_decode(sample["input_ids"], skip_special_tokens=True)
+    train_dataset = add_teacher_logits(teacher, tokenizer, tokenized["train"])
+
+    teacher_scores = _scores(teacher, tokenizer, validation, texts)
+    report = {"teacher": {"path": teacher_path, **teacher_scores}, "students": [],
+              "temperature": temperature, "alpha": alpha, "epochs": epochs, "max_f1_drop": max_f1_drop}
+    for spec in specs:
+        num_layers, hidden_size = parse_spec(spec)
+        output_dir = os.path.join(output_root, f"student-{spec}")
+        torch.manual_seed(seed)
+        student = make_student(teacher, num_layers, hidden_size)
+        distill(tokenizer, student, train_dataset, output_dir, epochs, batch_size,
+                learning_rate, temperature, alpha, seed)
+        scores = _scores(student.eval(), tokenizer, validation, texts)
+        report["students"].append({
+            "spec": spec,
+            "path": output_dir,
+            **scores,
+            "f1_drop": teacher_scores["f1"] - scores["f1"],
+            "speedup_p50": teacher_scores["latency_ms_p50"] / scores["latency_ms_p50"],
+            "speedup_throughput": scores["texts_per_sec"] / teacher_scores["texts_per_sec"],
+            "size_ratio": scores["parameters"] / teacher_scores["parameters"],
+        })
+
+    eligible = [s for s in report["students"] if s["f1_drop"] <= max_f1_drop]
+    report["recommended"] = max(eligible, key=lambda s: s["speedup_p50"])["spec"] if eligible else None
+    os.makedirs(output_root, exist_ok=True)
+    with open(os.path.join(output_root, "distill_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    teacher = report["teacher"]
+    print(f"{'model':<14}{'params':>9}{'F1':>8}{'F1 drop':>9}{'p50 ms':>9}{'speedup':>9}{'texts/s':>9}")
+    print(f"{'teacher':<14}{teacher['parameters'] / 1e6:>8.1f}M{teacher['f1']:>8.4f}{'':>9}"
+          f"{teacher['latency_ms_p50']:>9.2f}{'1.00x':>9}{teacher['texts_per_sec']:>9.0f}")
+    for s in report["students"]:
+        print(f"{s['spec']:<14}{s['parameters'] / 1e6:>8.1f}M{s['f1']:>8.4f}{s['f1_drop']:>+9.4f}"
+              f"{s['latency_ms_p50']:>9.2f}{s['speedup_p50']:>8.2f}x{s['texts_per_sec']:>9.0f}")
+    if report["recommended"]:
+        print(f"Fastest student within {report['max_f1_drop']} F1 of the teacher: {report['recommended']}")
+    else:
+        print(f"No student is within {report['max_f1_drop']} F1 of the teacher")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil the PII model into smaller students and compare them.")
+    parser.add_argument("--teacher", default="./pii-model", help="fine-tuned token-classification model directory")
+    parser.add_argument("--corpus", required=True, help="redact_demon.corpus directory the teacher was trained on")
+    parser.add_argument("--students", default="3,2,4x384", help="comma-separated LAYERS or LAYERSxHIDDEN specs")
+    parser.add_argument("--output", default="./pii-students", help="directory for the students and the report")
+    parser.add_argument("--epochs", type=float, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="weight of the soft-target loss")
+    parser.add_argument("--max-f1-drop", type=float, default=MAX_F1_DROP)
+    parser.add_argument("--max-train", type=int, default=0, help="train on only this many sentences; 0 for all")
+    parser.add_argument("--cache-dir", default=None, help="tokenized dataset cache (see redact_demon.cache)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from datasets import DatasetDict
+    from transformers import AutoConfig, AutoTokenizer
+
+    from redact_demon.cache import CACHE_DIR, cached_tokenize
+    from redact_demon.corpus import load_corpus
+
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher)
+    label2id = AutoConfig.from_pretrained(args.teacher).label2id
+    # Same split and cache key as main.ipynb
+    splits = load_corpus(args.corpus).to_dataset().train_test_split(test_size=0.2, seed=42)
+    dataset = DatasetDict({"train": splits["train"], "validation": splits["test"]})
+    tokenized = cached_tokenize(dataset, tokenizer, label2id, source=args.corpus, max_length=128,
+                                cache_dir=args.cache_dir or CACHE_DIR, test_size=0.2, split_seed=42)
+    if args.max_train:
+        tokenized["train"] = tokenized["train"].select(range(min(args.max_train, len(tokenized["train"]))))
+
+    report = distill_students(args.teacher, args.students.split(","), tokenized, args.output, args.epochs,
+                              args.batch_size, args.learning_rate, args.temperature, args.alpha,
+                              args.max_f1_drop, args.seed)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
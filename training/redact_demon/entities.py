@@ -0,0 +1,178 @@
+"""The extension's entity post-processing, vectorized over a batch of texts.
+
+In the browser, analysisManager.js takes the per-token predictions of the
+token-classification pipeline (no aggregation) with a score above 0.8, drops
+those that overlap a regex match, and hands them with the regex matches to
+EntityProcessor: getNamedEntities removes "O" and MISC labels,
+groupEntitiesByType splits them by type without the B-/I- prefix, and
+groupConsecutiveTokens merges, per type and in start order,
+  - two regex matches when the second starts at most 2 characters after the
+    first ends (the group keeps the first match's span and replacement),
+  - two model tokens when their indices are consecutive and the tags run
+    B- -> I- or I- -> I-,
+and never a regex match with a model token.
+
+entity_spans applies the same rules to logits, offset mappings and regex spans
+for N texts at once: argmax and the overlap test run on the whole batch, every
+kept token and regex match goes into one set of flat arrays sorted by
+(text, type, start), and group boundaries are a vectorized comparison of each
+row with the one before it, so Python only touches the spans it returns. Model
+spans run from the first token's start offset to the last token's end offset;
+the browser has no offsets and searches the text for the rebuilt word instead,
+which finds the same place unless that word also occurs earlier in the text.
+
+    from redact_demon.entities import predict_spans
+    spans = predict_spans(ner, texts, RegexRedactor())
+"""
+import numpy as np
+
+from redact_demon.inference import _softmax
+
+ML_THRESHOLD = 0.8  # ModelService.analyzeText keeps tokens scoring above this
+REGEX_GAP = 2  # groupConsecutiveTokens merges regex matches this many characters apart
+
+_ML, _REGEX = 0, 1
+_OTHER, _BEGIN, _INSIDE = 0, 1, 2
+
+
+def entity_type(label):
+    """EntityProcessor.getEntityType: "B-PER" -> "PER"; labels without a B-/I- prefix stay as they are."""
+    return label[2:] if label.startswith(("B-", "I-")) else label
+
+
+def _label_table(labels, types):
+    """Per label id: kept by getNamedEntities, type id and B-/I- tag."""
+    named = np.array([label != "O" and "MISC" not in label for label in labels])
+    type_ids = np.array([types.setdefault(entity_type(label), len(types)) for label in labels])
+    tags = np.array([_BEGIN if label.startswith("B-") else _INSIDE if label.startswith("I-") else _OTHER
+                     for label in labels])
+    return named, type_ids, tags
+
+
+def entity_spans(texts, logits, offsets, labels, regex_spans=None, mask=None, threshold=ML_THRESHOLD):
+    """Merged, typed spans per text, as analysisManager.processGroupedEntities positions them.
+
+    logits is (N, T, num_labels) and offsets (N, T, 2) for N texts padded to T
+    tokens, labels the label name of each logit column. regex_spans holds, per
+    text, the sorted non-overlapping (start, end, pattern) triples of
+    RegexRedactor.find_spans. mask marks the real tokens; by default every
+    token with a non-empty offset, which leaves out special tokens and padding.
+
+    Each span is a dict with start, end, entityType, source ("ml" or "regex"),
+    score, replacement and name (the text it covers), sorted by start. A span
+    starting inside an earlier one is dropped, as the extension's redaction
+    skips it.
+    """
+    logits = np.asarray(logits)
+    offsets = np.asarray(offsets).reshape(*logits.shape[:2], 2)
+    if mask is None:
+        mask = offsets[..., 1] > offsets[..., 0]
+    regex_spans = regex_spans if regex_spans is not None else [[] for _ in texts]
+
+    types = {}
+    named, label_types, label_tags = _label_table(labels, types)
+    scores = _softmax(logits)
+    label_ids = scores.argmax(axis=-1)
+    label_scores = np.take_along_axis(scores, label_ids[..., None], axis=-1)[..., 0]
+
+    # --- MODEL TOKENS ---
+    keep = np.asarray(mask, dtype=bool) & named[label_ids] & (label_scores > threshold)
+    ml_text, ml_index = np.nonzero(keep)
+    ml_start, ml_end = offsets[ml_text, ml_index, 0], offsets[ml_text, ml_index, 1]
+    ml_labels = label_ids[ml_text, ml_index]
+
+    # --- REGEX MATCHES ---
+    counts = [len(spans) for spans in regex_spans]
+    rx_text = np.repeat(np.arange(len(texts)), counts)
+    flat = [span for spans in regex_spans for span in spans]
+    rx_start = np.array([s for s, _, _ in flat], dtype=np.int64)
+    rx_end = np.array([e for _, e, _ in flat], dtype=np.int64)
+    rx_types = np.array([types.setdefault(p["entityType"], len(types)) for _, _, p in flat], dtype=np.int64)
+    rx_named = np.array([p["entityType"] != "O" and "MISC" not in p["entityType"] for _, _, p in flat], dtype=bool)
+
+    # combineAnalysisResults: a token overlapping any regex match of its text is dropped.
+    # Matches are sorted and disjoint, so only the last one starting before the token ends can overlap it.
+    stride = max((len(text) for text in texts), default=0) + 1
+    rx_key_start, rx_key_end = rx_text * stride + rx_start, rx_text * stride + rx_end
+    ml = np.ones(len(ml_text), dtype=bool)
+    if flat:
+        last = np.searchsorted(rx_key_start, ml_text * stride + ml_end, side="left") - 1
+        ml &= (last < 0) | (rx_key_end[np.maximum(last, 0)] <= ml_text * stride + ml_start)
+
+    # --- GROUPING ---
+    # One row per token or match, sorted like groupEntitiesByType + groupConsecutiveTokens do
+    source = np.concatenate([np.full(ml.sum(), _ML), np.full(rx_named.sum(), _REGEX)])
+    text_id = np.concatenate([ml_text[ml], rx_text[rx_named]])
+    type_id = np.concatenate([label_types[ml_labels[ml]], rx_types[rx_named]])
+    start = np.concatenate([ml_start[ml], rx_start[rx_named]]).astype(np.int64)
+    end = np.concatenate([ml_end[ml], rx_end[rx_named]]).astype(np.int64)
+    index = np.concatenate([ml_index[ml], np.zeros(rx_named.sum(), dtype=ml_index.dtype)])
+    tag = np.concatenate([label_tags[ml_labels[ml]], np.full(rx_named.sum(), _OTHER)])
+    score = np.concatenate([label_scores[ml_text, ml_index][ml], np.ones(rx_named.sum())])
+    pattern_of = np.concatenate([np.full(ml.sum(), -1), np.flatnonzero(rx_named)])
+    if not len(source):
+        return [[] for _ in texts]
+
+    sort_key = np.where(start != 0, start, index)  # JS sorts on `start || index`
+    # Stable, and regex matches before tokens at the same key, as they come first in the combined list
+    order = np.lexsort((-source, sort_key, type_id, text_id))
+    source, text_id, type_id, start, end, index, tag, score, pattern_of = (
+        a[order] for a in (source, text_id, type_id, start, end, index, tag, score, pattern_of))
+
+    same = (text_id[1:] == text_id[:-1]) & (type_id[1:] == type_id[:-1])
+    regex_run = (source[1:] == _REGEX) & (source[:-1] == _REGEX) & (start[1:] <= end[:-1] + REGEX_GAP)
+    token_run = ((source[1:] == _ML) & (source[:-1] == _ML) & (index[1:] == index[:-1] + 1)
+                 & (tag[:-1] != _OTHER) & (tag[1:] == _INSIDE))
+    firsts = np.flatnonzero(np.concatenate([[True], ~(same & (regex_run | token_run))]))
+    lasts = np.append(firsts[1:], len(source)) - 1
+
+    group_source = source[firsts]
+    group_end = np.where(group_source == _ML, end[lasts], end[firsts])
+    group_score = np.add.reduceat(score, firsts) / (lasts - firsts + 1)
+    positions = np.lexsort((group_end, start[firsts], text_id[firsts]))
+
+    type_names = list(types)
+    results = [[] for _ in texts]
+    covered = [0] * len(texts)
+    for g in positions.tolist():
+        d, s, e = int(text_id[firsts[g]]), int(start[firsts[g]]), int(group_end[g])
+        if s < covered[d]:
+            continue
+        covered[d] = e
+        kind = type_names[type_id[firsts[g]]]
+        if group_source[g] == _REGEX:
+            replacement, source_name = flat[pattern_of[firsts[g]]][2]["replacement"], "regex"
+        else:
+            replacement, source_name = f"[REDACTED_{kind}]", "ml"
+        results[d].append({
+            "start": s,
+            "end": e,
+            "name": texts[d][s:e],
+            "entityType": kind,
+            "source": source_name,
+            "score": float(group_score[g]),
+            "replacement": replacement,
+        })
+    return results
+
+
+def predict_spans(ner, texts, redactor=None, threshold=ML_THRESHOLD, batch_size=32):
+    """Run ner (a redact_demon.inference.NerModel) and redactor (a RegexRedactor) over texts
+    and group the results with entity_spans, batch by batch. Texts are truncated to one model input."""
+    results = []
+    for b in range(0, len(texts), batch_size):
+        batch = list(texts[b:b + batch_size])
+        encoding = ner.tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=ner.max_length,
+            return_offsets_mapping=True,
+            return_special_tokens_mask=True,
+            return_tensors=ner.tensor_type,
+        )
+        mask = (np.asarray(encoding["attention_mask"]) == 1) & (np.asarray(encoding["special_tokens_mask"]) == 0)
+        regex_spans = [redactor.find_spans(text) for text in batch] if redactor is not None else None
+        results.extend(entity_spans(batch, ner.logits(encoding), np.asarray(encoding["offset_mapping"]),
+                                    ner.labels, regex_spans, mask, threshold))
+    return results
@@ -0,0 +1,221 @@
+"""Export the trained model to ONNX, quantize it to int8 and check it still scores.
+
+    python -m redact_demon.export --model ./pii-model --output ./pii-model-onnx --corpus <corpus_dir>
+
+The output directory has the layout transformers.js loads: config.json and the
+tokenizer files at the top, onnx/model.onnx (float32) and
+onnx/model_quantized.onnx (int8) below, so it can be copied to
+redact-demon/public/assets/<model name>/ as it is. redact_demon.redact and
+redact_demon.server run the int8 graph when given this directory.
+
+Quantization is dynamic: MatMul weights are stored as int8 and activations are
+quantized per batch at run time, so no calibration data is needed. The int8
+graph is then scored with seqeval on the notebook's validation split next to
+the float torch model, exactly as compute_metrics scores it during training.
+If its F1 falls more than --tolerance below the float F1 the command exits with
+status 1. Model sizes and CPU latencies of all three variants go into
+export_report.json.
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from redact_demon.cache import IGNORE_INDEX, tokenize_and_align_labels
+from redact_demon.inference import NerModel, OnnxNerModel
+
+OPSET = 14
+TOLERANCE = 0.01  # largest F1 drop accepted from quantization
+MAX_EVAL = 5000  # validation sentences scored per model; 0 scores them all
+LATENCY_RUNS = 50
+THROUGHPUT_BATCH_SIZE = 32
+
+
+# --- EXPORT ---
+def export_onnx(model, tokenizer, path, opset=OPSET):
+    """Trace model to an ONNX graph with dynamic batch and sequence axes."""
+    import torch
+
+    accepted = inspect.signature(model.forward).parameters
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in accepted]
+    sample = tokenizer(["Redact Demon", "exports this model"], padding=True, return_tensors="pt")
+    inputs = tuple(sample[name] for name in input_names if name in sample)
+    input_names = input_names[:len(inputs)]
+    axes = {0: "batch", 1: "sequence"}
+
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # the TorchScript exporter needs no onnxscript
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model.eval(),
+            inputs,
+            path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes={name: axes for name in input_names + ["logits"]},
+            opset_version=opset,
+            do_constant_folding=True,
+            **kwargs,
+        )
+    return path
+
+
+def quantize(float_path, quantized_path, per_channel=False):
+    """Dynamic int8 quantization of every MatMul weight in the graph."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(float_path, quantized_path, per_channel=per_channel, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+# --- EVALUATION ---
+def validation_split(corpus_path, test_size=0.2, seed=42):
+    """The notebook's validation split of a redact_demon.corpus directory."""
+    from redact_demon.corpus import load_corpus
+
+    return load_corpus(corpus_path).to_dataset().train_test_split(test_size=test_size, seed=seed)["test"]
+
+
+def evaluate_f1(ner, tokenized, batch_size=32):
+    """seqeval scores of ner on a tokenized, label-aligned dataset, as compute_metrics reports them."""
+    from seqeval.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    id2label = ner.config.id2label
+    lengths = [len(ids) for ids in tokenized["input_ids"]]
+    order = np.argsort(lengths, kind="stable")  # similar lengths share a batch
+    references, predictions = [], []
+    for b in range(0, len(order), batch_size):
+        rows = tokenized[order[b:b + batch_size].tolist()]
+        batch = ner.tokenizer.pad(
+            {"input_ids": rows["input_ids"], "attention_mask": rows["attention_mask"]},
+            return_tensors=ner.tensor_type,
+        )
+        label_ids = ner.logits(batch).argmax(axis=-1)
+        for row, labels in zip(label_ids, rows["labels"]):
+            labels = np.asarray(labels)
+            keep = labels != IGNORE_INDEX
+            references.append([id2label[int(i)] for i in labels[keep]])
+            predictions.append([id2label[int(i)] for i in row[:len(labels)][keep]])
+    return {
+        "precision": float(precision_score(references, predictions)),
+        "recall": float(recall_score(references, predictions)),
+        "f1": float(f1_score(references, predictions)),
+        "accuracy": float(accuracy_score(references, predictions)),
+    }
+
+
+def measure_latency(ner, texts, runs=LATENCY_RUNS, batch_size=THROUGHPUT_BATCH_SIZE):
+    """Median and p95 ms for one text, and texts/sec when batched."""
+    ner(texts[:batch_size], batch_size=batch_size)  # warm-up
+    timings = []
+    for text in texts[:runs]:
+        started = time.perf_counter()
+        ner([text], batch_size=1)
+        timings.append((time.perf_counter() - started) * 1000)
+    started = time.perf_counter()
+    ner(texts, batch_size=batch_size)
+    seconds = time.perf_counter() - started
+    return {
+        "latency_ms_p50": float(np.percentile(timings, 50)),
+        "latency_ms_p95": float(np.percentile(timings, 95)),
+        "texts_per_sec": len(texts) / seconds,
+    }
+
+
+def _size_mb(path):
+    if os.path.isdir(path):
+        return sum(_size_mb(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path) / 1e6
+
+
+# --- DRIVER ---
+def export_and_check(model_path, output_dir, corpus_path=None, tolerance=TOLERANCE, max_eval=MAX_EVAL,
+                     per_channel=False, opset=OPSET, test_size=0.2, seed=42):
+    """Export, quantize and compare; return the report (also saved to export_report.json)."""
+    ner = NerModel.from_pretrained(model_path)
+    ner.tokenizer.save_pretrained(output_dir)
+    ner.config.save_pretrained(output_dir)
+    float_path = export_onnx(ner.model, ner.tokenizer, os.path.join(output_dir, "onnx", "model.onnx"), opset)
+    quantized_path = quantize(float_path, os.path.join(output_dir, "onnx", "model_quantized.onnx"), per_channel)
+
+    models = {
+        "torch": ner,
+        "onnx_float32": OnnxNerModel.from_pretrained(output_dir, "model.onnx"),
+        "onnx_int8": OnnxNerModel.from_pretrained(output_dir, "model_quantized.onnx"),
+    }
+    weights = [name for name in os.listdir(model_path) if name.endswith((".safetensors", ".bin"))]
+    sizes = {
+        "torch": sum(_size_mb(os.path.join(model_path, name)) for name in weights),
+        "onnx_float32": _size_mb(float_path),
+        "onnx_int8": _size_mb(quantized_path),
+    }
+    report = {"model": model_path, "output": output_dir, "tolerance": tolerance, "models": {}}
+
+    texts = None
+    if corpus_path:
+        from redact_demon.corpus import load_corpus
+
+        corpus = load_corpus(corpus_path)
+        validation = validation_split(corpus_path, test_size, seed)
+        if max_eval and len(validation) > max_eval:
+            validation = validation.select(range(max_eval))
+        texts = [" ".join(corpus.decode(ids)) for ids in validation["token_ids"]]
+        tokenized = validation.map(
+            tokenize_and_align_labels,
+            batched=True,
+            remove_columns=validation.column_names,
+            fn_kwargs={"tokenizer": ner.tokenizer, "label2id": ner.config.label2id, "max_length": ner.max_length,
+                       "vocab": corpus.vocab, "labels": corpus.labels},
+        )
+        report["eval_sentences"] = len(validation)
+
+    for name, model in models.items():
+        entry = {"size_mb": sizes[name]}
+        if texts is not None:
+            entry.update(evaluate_f1(model, tokenized))
+            entry.update(measure_latency(model, texts))
+        report["models"][name] = entry
+
+    if texts is not None:
+        drop = report["models"]["torch"]["f1"] - report["models"]["onnx_int8"]["f1"]
+        report["f1_drop"] = drop
+        report["passed"] = drop <= tolerance
+    with open(os.path.join(output_dir, "export_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the PII model to ONNX, quantize it to int8 and validate it.")
+    parser.add_argument("--model", default="./pii-model", help="trained token-classification model directory")
+    parser.add_argument("--output", default="./pii-model-onnx", help="directory for the transformers.js layout")
+    parser.add_argument("--corpus", help="redact_demon.corpus directory; its validation split is scored")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="largest F1 drop accepted from int8")
+    parser.add_argument("--max-eval", type=int, default=MAX_EVAL, help="validation sentences to score; 0 for all")
+    parser.add_argument("--per-channel", action="store_true", help="one int8 scale per output channel")
+    parser.add_argument("--opset", type=int, default=OPSET)
+    args = parser.parse_args()
+
+    report = export_and_check(args.model, args.output, args.corpus, args.tolerance, args.max_eval,
+                              args.per_channel, args.opset)
+
+    print(f"{'model':<14}{'size MB':>9}{'F1':>8}{'p50 ms':>9}{'texts/s':>9}")
+    for name, entry in report["models"].items():
+        print(f"{name:<14}{entry['size_mb']:>9.1f}{entry.get('f1', float('nan')):>8.4f}"
+              f"{entry.get('latency_ms_p50', float('nan')):>9.2f}{entry.get('texts_per_sec', float('nan')):>9.0f}")
+    if "passed" not in report:
+        print("No --corpus given: exported and quantized without checking F1.")
+        return
+    print(f"F1 drop {report['f1_drop']:+.4f} (tolerance {args.tolerance}) -> {'ok' if report['passed'] else 'FAILED'}")
+    if not report["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
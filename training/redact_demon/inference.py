@@ -0,0 +1,243 @@
+"""Batched NER inference that returns what the notebook's ner_pipeline returns.
+
+pipeline("token-classification", aggregation_strategy="simple") preprocesses,
+runs and post-processes each text on its own and builds a dict per token
+before grouping. NerModel tokenizes a whole batch in one call, runs one padded
+forward pass, and does the softmax, argmax and B-/I- grouping with NumPy over
+the batch, so per-text Python work is limited to the entities it returns.
+
+predict_long handles texts longer than one model input. Each text is
+tokenized once, with offsets and without special tokens, and cut into
+overlapping windows of token ids; the windows of all texts run through the
+model in padded batches. Where windows overlap, each token keeps the
+prediction from the window in which it sits furthest from an edge (or,
+with merge="confident", the most confident one), and entities are grouped
+over the whole text, so one that crosses a window boundary comes back whole
+with offsets into the original text. Work grows linearly with text length.
+"""
+import inspect
+import os
+
+import numpy as np
+
+WINDOW = 128  # tokens per window in predict_long, special tokens included; the training max_length
+OVERLAP = 32  # tokens shared by consecutive windows
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")  # what OnnxNerModel can feed a graph
+
+
+def _softmax(logits):
+    """Softmax exactly as the pipeline computes it."""
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class NerModel:
+    """Token-classification model with pipeline-compatible "simple" entity grouping."""
+
+    tensor_type = "pt"  # what the tokenizer returns for logits()
+
+    def __init__(self, model, tokenizer):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        # DistilBERT takes no token_type_ids even when a BERT tokenizer produces them
+        accepted = inspect.signature(model.forward).parameters
+        self._input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in accepted]
+        self._init_labels(model.config)
+
+    def _init_labels(self, config):
+        self.config = config
+        self.max_length = min(self.tokenizer.model_max_length, config.max_position_embeddings)
+        labels = [config.id2label[i] for i in range(config.num_labels)]
+        self.labels = labels
+        # Same split as the pipeline's get_tag(): "B-PER" -> (B, PER), "O" -> (I, O)
+        tags = [label[2:] if label.startswith(("B-", "I-")) else label for label in labels]
+        _, self._tag_ids = np.unique(tags, return_inverse=True)
+        self._is_begin = np.array([label.startswith("B-") for label in labels])
+        self._group_names = [label.split("-", 1)[-1] for label in labels]
+
+    @classmethod
+    def from_pretrained(cls, path):
+        from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+        return cls(AutoModelForTokenClassification.from_pretrained(path), AutoTokenizer.from_pretrained(path))
+
+    def __call__(self, texts, batch_size=32):
+        """Entities per text; a single string gives a single list, like the pipeline."""
+        if isinstance(texts, str):
+            return self([texts])[0]
+        results = [[] for _ in texts]
+        todo = [i for i, text in enumerate(texts) if text.strip()]
+        # Similar lengths share a batch, so little of each forward pass is padding
+        todo.sort(key=lambda i: len(texts[i]))
+        for b in range(0, len(todo), batch_size):
+            indices = todo[b:b + batch_size]
+            for i, entities in zip(indices, self.predict_batch([texts[i] for i in indices])):
+                results[i] = entities
+        return results
+
+    def logits(self, encoding):
+        import torch
+
+        inputs = {name: encoding[name] for name in self._input_names if name in encoding}
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().numpy()
+
+    def predict_batch(self, texts):
+        """One tokenizer call and one padded forward pass for all of texts."""
+        encoding = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_offsets_mapping=True,
+            return_special_tokens_mask=True,
+            return_tensors=self.tensor_type,
+        )
+        scores = _softmax(self.logits(encoding))
+        label_ids = scores.argmax(axis=-1)
+        label_scores = np.take_along_axis(scores, label_ids[..., None], axis=-1)[..., 0]
+
+        keep = (np.asarray(encoding["attention_mask"]) == 1) & (np.asarray(encoding["special_tokens_mask"]) == 0)
+        input_ids = np.asarray(encoding["input_ids"])
+        offsets = np.asarray(encoding["offset_mapping"])
+        return [
+            self._entities(text, input_ids[i, keep[i]], offsets[i, keep[i]], label_ids[i, keep[i]], label_scores[i, keep[i]])
+            for i, text in enumerate(texts)
+        ]
+
+    # --- LONG TEXTS ---
+    def predict_long(self, texts, window=WINDOW, overlap=OVERLAP, batch_size=32, merge="central"):
+        """Entities per text of any length, from overlapping windows of `window` tokens.
+
+        merge="central" keeps, for every token, the prediction of the window in
+        which it is furthest from an edge; merge="confident" keeps the one with
+        the highest score.
+        """
+        if isinstance(texts, str):
+            return self.predict_long([texts], window, overlap, batch_size, merge)[0]
+        if merge not in ("central", "confident"):
+            raise ValueError(f"merge must be 'central' or 'confident', not {merge!r}")
+        window = min(window, self.max_length)
+        head, tail = self._special_tokens()
+        content = window - len(head) - len(tail)
+        step = content - overlap
+        if step <= 0:
+            raise ValueError(f"overlap {overlap} leaves no room to advance windows of {content} text tokens")
+
+        encoding = self.tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+        docs, windows = [], []
+        for d, (ids, offsets) in enumerate(zip(encoding["input_ids"], encoding["offset_mapping"])):
+            n = len(ids)
+            docs.append((np.asarray(ids), np.asarray(offsets).reshape(-1, 2), None, np.full(n, -np.inf)))
+            start = 0
+            while n:
+                windows.append((d, start, min(start + content, n)))
+                if start + content >= n:
+                    break
+                start += step
+
+        for b in range(0, len(windows), batch_size):
+            batch = windows[b:b + batch_size]
+            inputs = self.tokenizer.pad(
+                {"input_ids": [head + docs[d][0][s:e].tolist() + tail for d, s, e in batch]},
+                return_tensors=self.tensor_type,
+            )
+            scores = _softmax(self.logits(inputs))
+            if self.tokenizer.padding_side == "left":
+                pads = scores.shape[1] - np.asarray(inputs["attention_mask"]).sum(axis=1)
+            else:
+                pads = np.zeros(len(batch), dtype=int)
+            for (d, s, e), row, pad in zip(batch, scores, pads):
+                ids, offsets, probs, best = docs[d]
+                if probs is None:
+                    probs = np.zeros((len(ids), row.shape[-1]), dtype=row.dtype)
+                    docs[d] = (ids, offsets, probs, best)
+                row = row[pad + len(head):pad + len(head) + (e - s)]
+                if merge == "central":
+                    position = np.arange(e - s)
+                    key = np.minimum(position, position[::-1]).astype(float)
+                else:
+                    key = row.max(axis=-1)
+                better = key > best[s:e]  # ties keep the earlier window
+                probs[s:e][better] = row[better]
+                best[s:e][better] = key[better]
+
+        results = []
+        for text, (ids, offsets, probs, _) in zip(texts, docs):
+            if probs is None:
+                results.append([])
+                continue
+            label_ids = probs.argmax(axis=-1)
+            label_scores = np.take_along_axis(probs, label_ids[:, None], axis=-1)[:, 0]
+            results.append(self._entities(text, ids, offsets, label_ids, label_scores))
+        return results
+
+    def _special_tokens(self):
+        """(head, tail): the special token ids the tokenizer puts around one sequence, e.g. [CLS] and [SEP]."""
+        bare = self.tokenizer("a", add_special_tokens=False)["input_ids"]
+        full = self.tokenizer("a")["input_ids"]
+        i = next(i for i in range(len(full)) if full[i:i + len(bare)] == bare)
+        return full[:i], full[i + len(bare):]
+
+    def _entities(self, text, input_ids, offsets, label_ids, label_scores):
+        if not len(label_ids):
+            return []
+        # A new group starts where the tag changes or a B- label appears
+        tag_ids = self._tag_ids[label_ids]
+        starts = np.flatnonzero(np.concatenate([[True], (tag_ids[1:] != tag_ids[:-1]) | self._is_begin[label_ids[1:]]]))
+        ends = np.append(starts[1:], len(label_ids))
+        mean_scores = np.add.reduceat(label_scores, starts) / (ends - starts)
+
+        entities = []
+        for start, end, score in zip(starts.tolist(), ends.tolist(), mean_scores):
+            group = self._group_names[label_ids[start]]
+            if group == "O":
+                continue
+            tokens = self.tokenizer.convert_ids_to_tokens(input_ids[start:end].tolist())
+            for k, token_id in enumerate(input_ids[start:end]):
+                if token_id == self.tokenizer.unk_token_id:  # the pipeline shows the original text
+                    tokens[k] = text[offsets[start + k][0]:offsets[start + k][1]]
+            entities.append({
+                "entity_group": group,
+                "score": score,
+                "word": self.tokenizer.convert_tokens_to_string(tokens),
+                "start": int(offsets[start][0]),
+                "end": int(offsets[end - 1][1]),
+            })
+        return entities
+
+
+class OnnxNerModel(NerModel):
+    """NerModel running an exported ONNX graph (see redact_demon.export) with onnxruntime."""
+
+    tensor_type = "np"
+
+    def __init__(self, session, tokenizer, config):
+        self.session = session
+        self.tokenizer = tokenizer
+        self._input_names = [i.name for i in session.get_inputs()]
+        unsupported = sorted(set(self._input_names) - set(ONNX_INPUTS))
+        if unsupported:
+            raise ValueError(f"ONNX graph takes inputs {unsupported}; only {list(ONNX_INPUTS)} are supported")
+        self._init_labels(config)
+
+    @classmethod
+    def from_pretrained(cls, path, file_name="model_quantized.onnx", threads=None):
+        """Load <path>/onnx/<file_name> with the config and tokenizer saved next to it."""
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(
+            os.path.join(path, "onnx", file_name), options, providers=["CPUExecutionProvider"]
+        )
+        return cls(session, AutoTokenizer.from_pretrained(path), AutoConfig.from_pretrained(path))
+
+    def logits(self, encoding):
+        inputs = {name: np.asarray(encoding[name], dtype=np.int64) for name in self._input_names if name in encoding}
+        if "token_type_ids" in self._input_names and "token_type_ids" not in inputs:
+            # Callers that pad only input_ids/attention_mask (predict_long, export.evaluate_f1): one segment
+            inputs["token_type_ids"] = np.zeros_like(inputs["input_ids"])
+        return self.session.run(["logits"], inputs)[0].astype(np.float32, copy=False)
@@ -0,0 +1,348 @@
+"""Incremental build of the synthetic corpus and the model, from names and addresses to pii-model.
+
+    python -m redact_demon.pipeline                  # bring everything up to date
+    python -m redact_demon.pipeline combine --dry-run
+    python -m redact_demon.pipeline --force format_address --jobs 2
+
+Each stage runs one module of the generate_data or process_data package
+under "training data" (or the notebook) with explicit input and output paths, and the stages form a DAG through those
+files:
+
+    generate_name -> name_to_conll
+    scrape -> format_address -> address_to_conll
+    generate_name, format_address -> combine -> notebook
+
+A stage's fingerprint hashes its parameters, its inputs' bytes and its code:
+the script plus every sibling module it imports, found by reading the import
+statements, or for the notebook its code cells and the redact_demon modules
+they import. A stage whose fingerprint and outputs match the last successful
+run is skipped. Downstream stages hash what upstream ones actually wrote, so
+a rerun that reproduces the same bytes stops there. Editing a template list in
+combine_name_address.py rebuilds combine and the notebook; the names and
+addresses are left alone. Stages whose inputs are ready run in parallel, so
+the names and addresses branches build side by side.
+
+Scraping hits the network and is not reproducible, so scrape only runs when
+addresses.csv is missing or with --force scrape. The state (fingerprints,
+output hashes, and a file hash cache keyed on size and mtime) lives in
+.pipeline/state.json next to this package, with one log per stage run.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from redact_demon.cache import file_digest
+
+TRAINING_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+DATA_DIR = os.path.join(TRAINING_DIR, "training data")
+STATE_DIR = os.path.join(TRAINING_DIR, ".pipeline")
+SEED = 0
+JOBS = 4
+
+
+def _data(name):
+    return os.path.normpath(os.path.join(DATA_DIR, name))
+
+
+def _script(name):
+    for folder in ("generate_data", "process_data"):
+        path = os.path.join(DATA_DIR, folder, name)
+        if os.path.exists(path):
+            return os.path.normpath(path)
+    raise FileNotFoundError(name)
+
+
+class Stage:
+    """One build step: a command with declared input and output paths.
+
+    external stages produce data that cannot be rebuilt on demand, so they
+    only run when an output is missing or when forced.
+    """
+
+    def __init__(self, name, script, inputs, outputs, args=(), env=None, external=False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args)
+        self.env = env or {}
+        self.external = external
+
+    def command(self):
+        if self.script.endswith(".ipynb"):
+            return [sys.executable, "-m", "jupyter", "nbconvert", "--to", "notebook", "--execute",
+                    "--ExecutePreprocessor.timeout=-1", "--output-dir", STATE_DIR, self.script]
+        module = os.path.splitext(os.path.relpath(self.script, DATA_DIR))[0].replace(os.sep, ".")
+        return [sys.executable, "-m", module, *self.args]
+
+    def cwd(self):
+        return TRAINING_DIR if self.script.endswith(".ipynb") else DATA_DIR
+
+
+def default_stages(seed=SEED, names=10_000, addresses=6_000, variants=3, sentences=None):
+    """The corpus and model build, with every random stage seeded."""
+    names_csv, addresses_csv = _data("sg_names.csv"), _data("addresses.csv")
+    augmented_csv, combined = _data("augmented_addresses.csv"), _data("synthetic_contextual_balanced.conll")
+    combine_args = ["--addresses", augmented_csv, "--names", names_csv, "--output", combined, "--seed", str(seed)]
+    if sentences:
+        combine_args += ["--total", str(sentences)]
+    model = os.path.normpath(os.path.join(TRAINING_DIR, "pii-model"))
+    return [
+        Stage("generate_name", _script("generate_name.py"), [], [names_csv],
+              ["--count", str(names), "--output", names_csv, "--seed", str(seed)]),
+        Stage("scrape", _script("address_scraper.py"), [], [addresses_csv],
+              ["--total", str(addresses), "--output", addresses_csv], external=True),
+        Stage("format_address", _script("format_address.py"), [addresses_csv], [augmented_csv],
+              ["--input", addresses_csv, "--output", augmented_csv, "--variants", str(variants), "--seed", str(seed)]),
+        Stage("address_to_conll", _script("address_to_CoNLL.py"), [augmented_csv], [_data("addresses_context_conll.txt")],
+              ["--input", augmented_csv, "--output", _data("addresses_context_conll.txt"), "--seed", str(seed)]),
+        Stage("name_to_conll", _script("name_to_CoNLL.py"), [names_csv], [_data("names_conll_shuffled.conll")],
+              ["--input", names_csv, "--output", _data("names_conll_shuffled.conll"), "--seed", str(seed)]),
+        Stage("combine", _script("combine_name_address.py"), [augmented_csv, names_csv], [combined], combine_args),
+        Stage("notebook", os.path.normpath(os.path.join(TRAINING_DIR, "main.ipynb")), [combined], [model],
+              env={"REDACT_DEMON_CONLL": combined}),
+    ]
+
+
+# --- GRAPH ---
+def dependencies(stages):
+    """{stage name: names of the stages writing its inputs}."""
+    producers = {path: stage.name for stage in stages for path in stage.outputs}
+    return {stage.name: sorted({producers[path] for path in stage.inputs if path in producers}) for stage in stages}
+
+
+def closure(stages, targets):
+    """targets and everything upstream of them, in declaration order."""
+    deps, wanted, todo = dependencies(stages), set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+# --- FINGERPRINTS ---
+def _imports(source):
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            names.add(module)
+            names.update(f"{module}.{alias.name}" if node.module else module + alias.name for alias in node.names)
+    return names
+
+
+def _notebook_source(path):
+    with open(path, encoding="utf-8") as f:
+        cells = json.load(f)["cells"]
+    code = ("".join(cell["source"]) for cell in cells if cell["cell_type"] == "code")
+    # Shell escapes and magics are not Python
+    return "\n".join(line for cell in code for line in cell.splitlines() if not line.lstrip().startswith(("!", "%")))
+
+
+def code_files(script):
+    """script and the local modules it imports, transitively.
+
+    The data modules import their siblings relatively; the notebook imports
+    redact_demon.<module>.
+    """
+    package = os.path.join(TRAINING_DIR, "redact_demon")
+    seen, todo = [], [script]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        if path.endswith(".ipynb"):
+            source = _notebook_source(path)
+        else:
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+        for name in _imports(source):
+            if name.startswith("redact_demon."):
+                candidate = os.path.join(package, name.split(".")[1] + ".py")
+            elif name.startswith(".") and not name.startswith(".."):
+                candidate = os.path.join(os.path.dirname(path), name[1:].split(".")[0] + ".py")
+            else:
+                continue
+            if os.path.exists(candidate):
+                todo.append(os.path.normpath(candidate))
+    return sorted(seen)
+
+
+class Hasher:
+    """File hashes cached on (size, mtime), so unchanged multi-GB corpora are not reread."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+
+    def __call__(self, path):
+        if os.path.isdir(path):
+            stamp = [[name, *self._stamp(os.path.join(root, name))]
+                     for root, _, files in sorted(os.walk(path)) for name in sorted(files)]
+        else:
+            stamp = self._stamp(path)
+        entry = self.cache.get(path)
+        if entry is None or entry["stamp"] != stamp:
+            entry = {"stamp": stamp, "digest": file_digest(path).hexdigest()}
+            self.cache[path] = entry
+        return entry["digest"]
+
+    @staticmethod
+    def _stamp(path):
+        info = os.stat(path)
+        return [info.st_size, info.st_mtime_ns]
+
+
+def fingerprint(stage, hasher):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({"name": stage.name, "args": stage.args, "env": stage.env},
+                             sort_keys=True).encode("utf-8"))
+    for path in stage.inputs:
+        digest.update(f"input {os.path.relpath(path, TRAINING_DIR)} {hasher(path)}".encode("utf-8"))
+    for path in code_files(stage.script):
+        digest.update(f"code {os.path.relpath(path, TRAINING_DIR)} {hasher(path)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# --- STATE ---
+def load_state(state_dir=STATE_DIR):
+    try:
+        with open(os.path.join(state_dir, "state.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"stages": {}, "files": {}}
+
+
+def save_state(state, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, "state.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def up_to_date(stage, print_, record, hasher):
+    """Why stage must run, or None if its last run still stands."""
+    if not all(os.path.exists(path) for path in stage.outputs):
+        return "missing output"
+    if stage.external:
+        return None
+    if record is None:
+        return "never built"
+    if record["fingerprint"] != print_:
+        return "inputs, code or parameters changed"
+    if any(record["outputs"].get(path) != hasher(path) for path in stage.outputs):
+        return "outputs changed since the last build"
+    return None
+
+
+# --- RUNNING ---
+def _run_stage(stage, state_dir):
+    os.makedirs(os.path.join(state_dir, "logs"), exist_ok=True)
+    log_path = os.path.join(state_dir, "logs", f"{stage.name}.log")
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(stage.command(), cwd=stage.cwd(), env={**os.environ, **stage.env},
+                                stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.perf_counter() - started, log_path
+
+
+def build(stages, targets=None, force=(), jobs=JOBS, dry_run=False, state_dir=STATE_DIR):
+    """Bring targets (default: every stage) up to date; return {stage: "built" | "skipped" | "failed" | ...}."""
+    stages = closure(stages, targets or [stage.name for stage in stages])
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    state = load_state(state_dir)
+    hasher = Hasher(state["files"])
+    outcome, running = {}, {}
+
+    def ready(stage):
+        return stage.name not in outcome and stage.name not in running.values() and \
+            all(outcome.get(dep) in ("built", "skipped", "would run") for dep in deps[stage.name])
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            for stage in stages:
+                if not ready(stage):
+                    continue
+                if any(outcome.get(dep) == "would run" for dep in deps[stage.name]):
+                    reason = "upstream would run"
+                else:
+                    print_ = fingerprint(stage, hasher)
+                    record = state["stages"].get(stage.name)
+                    reason = "forced" if stage.name in force else up_to_date(stage, print_, record, hasher)
+                if reason is None:
+                    outcome[stage.name] = "skipped"
+                    print(f"{stage.name:<18} up to date", flush=True)
+                elif dry_run:
+                    outcome[stage.name] = "would run"
+                    print(f"{stage.name:<18} would run ({reason})", flush=True)
+                else:
+                    print(f"{stage.name:<18} running ({reason})", flush=True)
+                    running[pool.submit(_run_stage, stage, state_dir)] = stage.name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = by_name[running.pop(future)]
+                code, seconds, log_path = future.result()
+                if code != 0:
+                    outcome[stage.name] = "failed"
+                    print(f"{stage.name:<18} FAILED with status {code} after {seconds:.1f}s, see {log_path}", flush=True)
+                    continue
+                outcome[stage.name] = "built"
+                # Fingerprint what the stage actually ran on; hash its outputs for the next run's check
+                state["stages"][stage.name] = {
+                    "fingerprint": fingerprint(stage, hasher),
+                    "outputs": {path: hasher(path) for path in stage.outputs if os.path.exists(path)},
+                    "seconds": seconds,
+                    "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                save_state(state, state_dir)
+                print(f"{stage.name:<18} built in {seconds:.1f}s", flush=True)
+
+    for stage in stages:
+        outcome.setdefault(stage.name, "blocked")
+        if outcome[stage.name] == "blocked":
+            print(f"{stage.name:<18} not run: an upstream stage failed", flush=True)
+    if not dry_run:
+        save_state(state, state_dir)
+    return outcome
+
+
+def main():
+    stages = default_stages()
+    names = [stage.name for stage in stages]
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the synthetic corpus and the model.")
+    parser.add_argument("targets", nargs="*", help=f"stages to bring up to date with their inputs; any of {', '.join(names)}")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE", help="rerun this stage; repeatable")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="stages run at the same time")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed passed to every random stage")
+    parser.add_argument("--names", type=int, default=10_000, help="names to generate")
+    parser.add_argument("--addresses", type=int, default=6_000, help="addresses to scrape")
+    parser.add_argument("--variants", type=int, default=3, help="augmented variants per address")
+    parser.add_argument("--sentences", type=int, default=None, help="sentences in the combined corpus")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run without running it")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.targets + args.force if name not in names]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(names)}")
+    stages = default_stages(args.seed, args.names, args.addresses, args.variants, args.sentences)
+    outcome = build(stages, args.targets, set(args.force), args.jobs, args.dry_run)
+    if "failed" in outcome.values():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
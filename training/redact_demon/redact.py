@@ -0,0 +1,291 @@
+"""Redact large text files with the extension's regex patterns and, optionally, the NER model.
+
+    python -m redact_demon.redact export.txt -o export.redacted.txt --workers 4
+    python -m redact_demon.redact chats.txt -o chats.redacted.txt --ner-model ./pii-model
+
+The input is memory-mapped and cut into chunks that end on a line break. Each
+chunk is scanned from its start, with a little context before it for
+lookbehinds and an overlap window after it, so a match that crosses the chunk
+end is still found whole. A span belongs to the chunk it starts in.
+
+A worker cannot know whether a match from the previous chunk, kept or lost to
+an earlier pattern, runs past its start. Each chunk therefore reports whether
+any match tried in it crosses its end; when one does, the parent scans the
+next chunk again from the last boundary nothing crossed, so the output is the
+same as RegexRedactor.redact() over the whole file. Workers return only span
+offsets; the parent copies the text between them straight from the map into
+the output.
+"""
+import argparse
+import mmap
+import os
+import time
+from multiprocessing import Pool
+
+from tqdm import tqdm
+
+from redact_demon.regex_redactor import RegexRedactor
+
+CHUNK_SIZE = 8 << 20  # bytes per work unit
+OVERLAP = 4096  # bytes scanned past the chunk end for matches that cross it
+CONTEXT = 64  # bytes before the chunk start visible to lookbehinds and \b
+ENCODING_ERRORS = "surrogateescape"  # undecodable bytes round-trip one char each
+
+
+# --- CHUNKING ---
+def _char_boundary(buf, pos):
+    """First position at or after pos that does not sit inside a UTF-8 sequence."""
+    while pos < len(buf) and 0x80 <= buf[pos] < 0xC0:
+        pos += 1
+    return pos
+
+
+def plan_chunks(buf, chunk_size=CHUNK_SIZE):
+    """Yield (start, end) byte ranges covering buf, each ending just after a newline when possible."""
+    size, start = len(buf), 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        if end < size:
+            newline = buf.find(b"\n", end, min(end + chunk_size, size))
+            end = newline + 1 if newline != -1 else _char_boundary(buf, end)
+        yield start, end
+        start = end
+
+
+def _byte_offsets(text, positions):
+    """Map sorted character positions in text to UTF-8 byte offsets."""
+    offsets, prev_char, prev_byte = [], 0, 0
+    for pos in positions:
+        prev_byte += len(text[prev_char:pos].encode("utf-8", ENCODING_ERRORS))
+        prev_char = pos
+        offsets.append(prev_byte)
+    return offsets
+
+
+# --- NER ---
+def load_ner(model_path, threads=None):
+    """Trained model wrapped to return what main.ipynb's ner_pipeline returns, batched.
+
+    A directory written by redact_demon.export runs its int8 ONNX graph instead of torch.
+    """
+    from redact_demon.inference import NerModel, OnnxNerModel
+
+    if os.path.isdir(os.path.join(model_path, "onnx")):
+        return OnnxNerModel.from_pretrained(model_path, threads=threads)
+    return NerModel.from_pretrained(model_path)
+
+
+def _ner_lines(text, start, end):
+    """(offset, line) for each non-blank line of text[start:end]."""
+    pos = start
+    while pos < end:
+        line_end = text.find("\n", pos, end)
+        line_end = end if line_end == -1 else line_end
+        if text[pos:line_end].strip():
+            yield pos, text[pos:line_end]
+        pos = line_end + 1
+
+
+def ner_spans(ner, text, start, end, threshold=0.0, batch_size=32):
+    """(start, end, replacement, entity_type) for model entities found in text[start:end].
+
+    Each line goes to the model whole; lines longer than one model input are
+    covered by overlapping windows (NerModel.predict_long), so no entity is cut.
+    """
+    lines = list(_ner_lines(text, start, end))
+    if not lines:
+        return []
+    spans = []
+    results = ner.predict_long([line for _, line in lines], batch_size=batch_size)
+    for (offset, _), entities in zip(lines, results):
+        for entity in entities:
+            group = entity["entity_group"]
+            # Same filter as EntityProcessor.getNamedEntities
+            if group == "O" or "MISC" in group or entity["score"] < threshold:
+                continue
+            spans.append((offset + entity["start"], offset + entity["end"], f"[REDACTED_{group}]", group))
+    return spans
+
+
+def _merge(regex_spans, model_spans):
+    """Add model spans to the regex ones wherever they do not overlap a regex span (or each other)."""
+    merged, i = [], 0
+    for span in sorted(model_spans):
+        while i < len(regex_spans) and regex_spans[i][0] < span[0]:
+            merged.append(regex_spans[i])
+            i += 1
+        if merged and merged[-1][1] > span[0]:
+            continue
+        if i < len(regex_spans) and regex_spans[i][0] < span[1]:
+            continue
+        merged.append(span)
+    merged.extend(regex_spans[i:])
+    return merged
+
+
+# --- WORKERS ---
+_state = {}
+
+
+def _init_worker(path, settings, ner_model, ner_threshold, torch_threads):
+    _state["redactor"] = RegexRedactor(settings=settings)
+    _state["ner"] = None
+    _state["ner_threshold"] = ner_threshold
+    if ner_model:
+        if torch_threads:
+            import torch
+
+            torch.set_num_threads(torch_threads)
+        _state["ner"] = load_ner(ner_model, torch_threads)
+    f = open(path, "rb")
+    _state["buf"] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _scan(buf, redactor, start, end, scan_from=None, overlap=OVERLAP):
+    """Regex spans starting in buf[start:end], with the decoded window they were found in.
+
+    The regex scan begins at scan_from (default start), which must be a point
+    no match carries over; the context before it only feeds lookbehinds and
+    \\b. Returns (window_start, text, core_start, core_end, spans, crosses):
+    text is the window decoded, buf[start:end] is text[core_start:core_end],
+    spans are (start, end, replacement, entity_type) in characters of text,
+    and crosses tells whether a match tried in the chunk runs past its end.
+    """
+    scan_from = start if scan_from is None else scan_from
+    window_start = _char_boundary(buf, max(0, scan_from - CONTEXT))
+    while True:
+        window_end = _char_boundary(buf, min(len(buf), end + overlap))
+        raw = buf[window_start:window_end]
+        text = raw.decode("utf-8", ENCODING_ERRORS)
+
+        if len(text) == len(raw):
+            scan_pos, core_start, core_end = scan_from - window_start, start - window_start, end - window_start
+        else:
+            scan_pos = len(buf[window_start:scan_from].decode("utf-8", ENCODING_ERRORS))
+            head = buf[window_start:start].decode("utf-8", ENCODING_ERRORS)
+            core = buf[start:end].decode("utf-8", ENCODING_ERRORS)
+            core_start, core_end = len(head), len(head) + len(core)
+
+        found, reach = redactor.scan(text, scan_pos, core_end)
+        # A match running into the edge of the window may continue past it: look further
+        if reach >= len(text) and window_end < len(buf):
+            overlap *= 2
+            continue
+        spans = [(s, e, p["replacement"], p["entityType"]) for s, e, p in found if core_start <= s < core_end]
+        return window_start, text, core_start, core_end, spans, reach > core_end
+
+
+def _to_bytes(window_start, text, spans):
+    """Spans in characters of a window decoded from window_start, as absolute byte offsets."""
+    if len(text) == len(text.encode("utf-8", ENCODING_ERRORS)):
+        return [(window_start + s, window_start + e, rep, kind) for s, e, rep, kind in spans]
+    positions = sorted({p for s, e, _, _ in spans for p in (s, e)})
+    offsets = dict(zip(positions, _byte_offsets(text, positions)))
+    return [(window_start + offsets[s], window_start + offsets[e], rep, kind) for s, e, rep, kind in spans]
+
+
+def _chunk_spans(chunk):
+    """Regex spans, model spans and whether a match crosses the chunk end.
+
+    Spans are (byte_start, byte_end, replacement, entity_type) starting in the
+    chunk, scanned as if nothing carried over its start.
+    """
+    start, end = chunk
+    buf, ner = _state["buf"], _state["ner"]
+    window_start, text, core_start, core_end, spans, crosses = _scan(buf, _state["redactor"], start, end)
+    model_spans = []
+    if ner is not None:
+        model_spans = ner_spans(ner, text, core_start, core_end, _state["ner_threshold"])
+    return _to_bytes(window_start, text, spans), _to_bytes(window_start, text, model_spans), crosses
+
+
+# --- DRIVER ---
+def redact_file(input_path, output_path, settings=None, workers=1, chunk_size=CHUNK_SIZE,
+                ner_model=None, ner_threshold=0.0, progress=True):
+    """Write a redacted copy of input_path; return {entity_type: count} and timing stats."""
+    counts, started = {}, time.perf_counter()
+    size = os.path.getsize(input_path)
+
+    with open(output_path, "wb") as out:
+        if size == 0:
+            return {"bytes": 0, "seconds": 0.0, "mb_per_sec": 0.0, "counts": counts}
+
+        with open(input_path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        chunks = list(plan_chunks(buf, chunk_size))
+        # Each NER worker gets its share of the cores instead of all of them
+        torch_threads = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else 0
+        initargs = (input_path, settings, ner_model, ner_threshold, torch_threads)
+
+        if workers > 1:
+            pool = Pool(workers, initializer=_init_worker, initargs=initargs)
+            results = pool.imap(_chunk_spans, chunks)
+            redactor = RegexRedactor(settings=settings)
+        else:
+            pool = None
+            _init_worker(*initargs)
+            results = map(_chunk_spans, chunks)
+            redactor = _state["redactor"]
+
+        bar = tqdm(total=size, unit="B", unit_scale=True, desc="Redacting", disable=not progress)
+        cursor = 0
+        clean = 0  # latest chunk boundary no match carries over
+        try:
+            for (start, end), (spans, model_spans, crosses) in zip(chunks, results):
+                if clean < start:
+                    # A match from before runs into this chunk, so the worker, which
+                    # scanned from the chunk start, may have started mid-match: scan
+                    # again from the last boundary nothing crossed
+                    window_start, text, _, _, rescanned, crosses = _scan(buf, redactor, start, end, clean)
+                    spans = _to_bytes(window_start, text, rescanned)
+                if not crosses:
+                    clean = end
+                if model_spans:
+                    spans = _merge(spans, model_spans)
+                for span_start, span_end, replacement, kind in spans:
+                    if span_start < cursor:  # a model span under a regex span from the previous chunk
+                        continue
+                    out.write(buf[cursor:span_start])
+                    out.write(replacement.encode("utf-8"))
+                    cursor = span_end
+                    counts[kind] = counts.get(kind, 0) + 1
+                if cursor < end:
+                    out.write(buf[cursor:end])
+                    cursor = end
+                bar.update(end - bar.n)
+        finally:
+            bar.close()
+            if pool is not None:
+                pool.close()
+                pool.join()
+            buf.close()
+
+    seconds = time.perf_counter() - started
+    return {"bytes": size, "seconds": seconds, "mb_per_sec": size / 1e6 / seconds, "counts": counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redact PII from large text files.")
+    parser.add_argument("input", help="UTF-8 text file to redact")
+    parser.add_argument("-o", "--output", required=True, help="where to write the redacted copy")
+    parser.add_argument("--workers", type=int, default=1, help="processes scanning chunks in parallel")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes per chunk")
+    parser.add_argument("--disable", action="append", default=[], metavar="ID",
+                        help="pattern id from regexPatterns.json to skip; repeatable")
+    parser.add_argument("--ner-model", help="trained token-classification model directory, e.g. ./pii-model")
+    parser.add_argument("--ner-threshold", type=float, default=0.0, help="minimum entity score to redact")
+    parser.add_argument("--quiet", action="store_true", help="no progress bar")
+    args = parser.parse_args()
+
+    settings = {f"pattern_{pattern_id}_enabled": False for pattern_id in args.disable}
+    stats = redact_file(args.input, args.output, settings, args.workers, args.chunk_size,
+                        args.ner_model, args.ner_threshold, progress=not args.quiet)
+
+    print(f"Redacted {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s "
+          f"({stats['mb_per_sec']:.2f} MB/s, {args.workers} worker(s)) -> {args.output}")
+    for kind, count in sorted(stats["counts"].items()):
+        print(f"  {kind}: {count}")
+
+
+if __name__ == "__main__":
+    main()
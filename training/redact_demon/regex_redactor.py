@@ -0,0 +1,288 @@
+"""Offline regex redaction with the browser extension's pattern table.
+
+The patterns live in redact-demon/src/utils/regexPatterns.json, which the
+extension's RegexPatternMatcher imports as well, so logs and datasets scrubbed
+here follow the same rules as the browser.
+
+RegexPatternMatcher runs every enabled pattern over the text in turn and keeps a
+match only if it overlaps nothing accepted by an earlier pattern. Here the
+enabled patterns are compiled into one alternation of named groups and the text
+is scanned once. Every match of any single pattern has to start inside one of
+the combined hits, so the per-pattern matches, and with them the JS priority
+rules, are recovered by trying each pattern only at positions inside those
+hits. Text between hits is never looked at again.
+"""
+import json
+import os
+import re
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+PATTERNS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+    "redact-demon", "src", "utils", "regexPatterns.json",
+)
+# JS 'gi': case-insensitive, and \d, \w and \b only know ASCII there as well
+FLAGS = re.IGNORECASE | re.ASCII
+WHITESPACE_RUN = re.compile(r"\s+")
+
+
+def load_patterns(path=PATTERNS_PATH):
+    """Read the shared pattern table: dicts with id, pattern, replacement, enabled, entityType, ..."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _starts_at_boundary(pattern):
+    """True if every match of `pattern` begins with its leading \\b."""
+    data = sre_parse.parse(pattern, FLAGS).data
+    return pattern.startswith("\\b") and bool(data) and data[0] == (sre_parse.AT, sre_parse.AT_BOUNDARY)
+
+
+def _combine(patterns):
+    """One alternation with a named group per pattern.
+
+    The combined regex only has to find every position where some pattern
+    matches, not which one wins, so alternatives may be reordered. The ones
+    that open with \\b share a single boundary check; without it the engine
+    would enter each of them at every position of the text.
+    """
+    bounded, free = [], []
+    for i, p in enumerate(patterns):
+        if _starts_at_boundary(p["pattern"]):
+            bounded.append(f"(?P<p{i}>{p['pattern'][2:]})")
+        else:
+            free.append(f"(?P<p{i}>{p['pattern']})")
+    if bounded:
+        free.insert(0, r"\b(?:" + "|".join(bounded) + ")")
+    return "|".join(free)
+
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r"\d", sre_parse.CATEGORY_NOT_DIGIT: r"\D",
+    sre_parse.CATEGORY_SPACE: r"\s", sre_parse.CATEGORY_NOT_SPACE: r"\S",
+    sre_parse.CATEGORY_WORD: r"\w", sre_parse.CATEGORY_NOT_WORD: r"\W",
+}
+_ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None))
+
+
+def _class_source(items):
+    """Rebuild a [...] class from its parsed items, or None if it holds something unexpected."""
+    negate = bool(items) and items[0][0] is sre_parse.NEGATE
+    parts = []
+    for op, av in items[1:] if negate else items:
+        if op is sre_parse.LITERAL:
+            parts.append(re.escape(chr(av)))
+        elif op is sre_parse.RANGE:
+            parts.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op is sre_parse.CATEGORY and av in _CATEGORIES:
+            parts.append(_CATEGORIES[av])
+        else:
+            return None
+    return "[" + ("^" if negate else "") + "".join(parts) + "]"
+
+
+def _first_chars(seq):
+    """(alternatives, nullable) for a parsed sequence.
+
+    alternatives are regex sources of single characters that can begin a match
+    (None when that cannot be worked out); nullable means the sequence can match
+    the empty string, so whatever follows it can begin a match too.
+    """
+    alternatives = []
+    for op, av in seq:
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_parse.LITERAL:
+            return alternatives + [re.escape(chr(av))], False
+        if op is sre_parse.NOT_LITERAL:
+            return alternatives + [f"[^{re.escape(chr(av))}]"], False
+        if op is sre_parse.IN:
+            source = _class_source(av)
+            return (None if source is None else alternatives + [source]), False
+        if op is sre_parse.SUBPATTERN:
+            sub, nullable = _first_chars(av[3])
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            sub, nullable = _first_chars(av)
+        elif op in _REPEATS:
+            sub, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        elif op is sre_parse.BRANCH:
+            branches = [_first_chars(branch) for branch in av[1]]
+            if any(sub is None for sub, _ in branches):
+                return None, False
+            sub = [alt for branch, _ in branches for alt in branch]
+            nullable = any(nullable for _, nullable in branches)
+        else:
+            return None, False
+        if sub is None:
+            return None, False
+        alternatives += sub
+        if not nullable:
+            return alternatives, False
+    return alternatives, True
+
+
+def _starter(pattern):
+    """Regex matching every position where `pattern` could start, or None to try them all."""
+    data = sre_parse.parse(pattern, FLAGS).data
+    alternatives, nullable = _first_chars(data)
+    if alternatives is None or nullable:
+        return None
+    boundary = r"\b" if data and data[0] == (sre_parse.AT, sre_parse.AT_BOUNDARY) else ""
+    return re.compile(boundary + "(?:" + "|".join(dict.fromkeys(alternatives)) + ")", FLAGS)
+
+
+def _accept(accepted, found, pattern):
+    """Merge one pattern's matches into the accepted spans, dropping those that overlap them.
+
+    Both lists are sorted and each is free of overlaps, so one linear pass does.
+    """
+    merged, i = [], 0
+    for start, end in found:
+        while i < len(accepted) and accepted[i][0] < start:
+            merged.append(accepted[i])
+            i += 1
+        if merged and merged[-1][1] > start and merged[-1][2] is not pattern:
+            continue
+        if i < len(accepted) and accepted[i][0] < end:
+            continue
+        merged.append((start, end, pattern))
+    merged.extend(accepted[i:])
+    return merged
+
+
+class RegexRedactor:
+    """Find and replace PII with one combined scan, matching RegexPatternMatcher.analyzeText."""
+
+    def __init__(self, patterns=None, settings=None):
+        self.patterns = [dict(p) for p in (patterns if patterns is not None else load_patterns())]
+        if settings:
+            self.apply_settings(settings)
+        self._compile()
+
+    def apply_settings(self, settings):
+        """Apply `pattern_<id>_enabled` flags, as saved by the extension popup."""
+        for pattern in self.patterns:
+            key = f"pattern_{pattern['id']}_enabled"
+            if key in settings:
+                pattern["enabled"] = settings[key]
+        self._compile()
+
+    def _compile(self):
+        self.enabled = [p for p in self.patterns if p.get("enabled", True)]
+        self._regexes = [re.compile(p["pattern"], FLAGS) for p in self.enabled]
+        self._starters = [_starter(p["pattern"]) for p in self.enabled]
+        self._combined = re.compile(_combine(self.enabled), FLAGS) if self.enabled else None
+
+    # --- SCANNING ---
+    def _pattern_matches(self, text, hits):
+        """Per enabled pattern, the (start, end) pairs a global exec loop over `text` would find."""
+        matches = []
+        for regex, starter in zip(self._regexes, self._starters):
+            found, pos = [], 0
+            for start, end in hits:
+                if pos >= end:
+                    continue
+                if starter is None:
+                    candidates = range(max(pos, start), end)
+                else:
+                    candidates = (m.start() for m in starter.finditer(text, max(pos, start), end))
+                for p in candidates:
+                    if p < pos:
+                        continue
+                    m = regex.match(text, p)
+                    if m is not None:
+                        found.append(m.span())
+                        pos = m.end()
+            matches.append(found)
+        return matches
+
+    def find_spans(self, text, pos=0):
+        """Sorted, non-overlapping (start, end, pattern) triples, earlier patterns winning overlaps.
+
+        The scan starts at pos; lookbehinds and \\b still see the text before it.
+        """
+        return self.scan(text, pos)[0]
+
+    def scan(self, text, pos=0, boundary=None):
+        """find_spans plus how far the matches tried before `boundary` reach.
+
+        Returns (spans, reach): reach is the furthest end of any match that
+        starts before boundary (default: the end of text), whether it was kept
+        or lost to an earlier pattern. While reach <= boundary nothing carries
+        over the boundary, so a scan started there finds what this one finds
+        after it.
+        """
+        if self._combined is None:
+            return [], 0
+        boundary = len(text) if boundary is None else boundary
+        hits = [m.span() for m in self._combined.finditer(text, pos)]
+        if not hits:
+            return [], 0
+        if len(self.enabled) == 1:
+            return [(start, end, self.enabled[0]) for start, end in hits], _reach(hits, boundary)
+
+        accepted, reach = [], _reach(hits, boundary)
+        for pattern, found in zip(self.enabled, self._pattern_matches(text, hits)):
+            accepted = _accept(accepted, found, pattern)
+            reach = max(reach, _reach(found, boundary))
+        return accepted, reach
+
+    def analyze_text(self, text):
+        """Detected entities in the same shape RegexPatternMatcher.analyzeText returns."""
+        entities = []
+        index, prev = 0, 0
+        for start, end, pattern in self.find_spans(text):
+            # Token index = whitespace runs before the match; count only the new stretch
+            index += len(WHITESPACE_RUN.findall(text, prev, start))
+            if 0 < prev < start and text[prev - 1].isspace() and text[prev].isspace():
+                index -= 1  # a run straddling `prev` was counted on both sides
+            prev = start
+            entities.append({
+                "word": text[start:end],
+                "entity": pattern["entityType"],
+                "score": 1.0,
+                "start": start,
+                "end": end,
+                "index": index,
+                "source": "regex",
+                "patternId": pattern["id"],
+                "description": pattern["description"],
+                "replacement": pattern["replacement"],
+            })
+        return entities
+
+    # --- REDACTION ---
+    def redact(self, text):
+        """Return text with every detected span replaced by its pattern's replacement token."""
+        return _replace(text, self.find_spans(text))
+
+    def redact_with_counts(self, text):
+        """Redacted text plus a {entityType: count} tally of what was replaced."""
+        spans = self.find_spans(text)
+        counts = {}
+        for _, _, pattern in spans:
+            counts[pattern["entityType"]] = counts.get(pattern["entityType"], 0) + 1
+        return _replace(text, spans), counts
+
+
+def _reach(spans, boundary):
+    """Furthest end among the sorted (start, end) spans that start before boundary."""
+    return max((end for start, end in spans if start < boundary), default=0)
+
+
+def _replace(text, spans):
+    if not spans:
+        return text
+    parts, pos = [], 0
+    for start, end, pattern in spans:
+        parts.append(text[pos:start])
+        parts.append(pattern["replacement"])
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
@@ -0,0 +1,196 @@
+"""Local NER inference server that groups concurrent requests into micro-batches.
+
+    python -m redact_demon.server --model ./pii-model --port 8765 --threads 4
+    python -m redact_demon.server --model ./pii-model --unix /tmp/redact-demon.sock
+
+POST /predict with {"text": "..."} or {"texts": ["...", ...]} and get back
+{"entities": [...]} (one list per text for "texts"), in the shape the
+notebook's ner_pipeline returns. GET /stats reports batch sizes and latency
+percentiles; GET /health answers once the model is loaded.
+
+Requests are queued as they arrive. The batching loop takes the oldest one,
+keeps collecting until the batch is full or max_wait_ms has passed since it
+arrived, and runs the whole batch as one padded forward pass on a dedicated
+thread. Requests arriving while a batch runs wait for the next one, so batches
+grow with load and shrink back to single texts when the server is idle. Texts
+longer than one model input are not truncated: they run as overlapping windows
+(NerModel.predict_long) in the same batch.
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from redact_demon.redact import load_ner
+
+MAX_BATCH_SIZE = 32
+MAX_WAIT_MS = 5.0
+LATENCY_WINDOW = 10_000  # recent requests kept for the latency percentiles
+
+
+def _jsonable(entity):
+    return {
+        "entity_group": entity["entity_group"],
+        "score": float(entity["score"]),
+        "word": entity["word"],
+        "start": int(entity["start"]),
+        "end": int(entity["end"]),
+    }
+
+
+class MicroBatcher:
+    """Collect single-text requests into batches for one forward pass each."""
+
+    def __init__(self, ner, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.ner = ner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        # One forward pass at a time; torch spreads each one over its own threads
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    async def predict(self, text):
+        """Entities for one text, computed in whichever batch it lands in."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    def _predict_batch(self, texts):
+        # Short texts are one window each; long pastes are covered by overlapping windows
+        outputs = self.ner.predict_long(texts, batch_size=self.max_batch_size)
+        return [[_jsonable(entity) for entity in entities] for entities in outputs]
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or its deadline passes."""
+        batch = [await self.queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._predict_batch, texts)
+            except Exception as error:  # fail this batch's requests, keep serving
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            finished = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            for (_, future, arrived), entities in zip(batch, results):
+                self.latencies.append(finished - arrived)
+                if not future.done():
+                    future.set_result(entities)
+            self.requests += len(batch)
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            "requests": self.requests,
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "queued": self.queue.qsize(),
+        }
+
+
+# --- HTTP ---
+USAGE = 'expected {"text": str} or {"texts": [str, ...]}'
+
+
+def make_app(batcher):
+    from aiohttp import web
+
+    async def predict(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text=USAGE)
+        if isinstance(body.get("text"), str):
+            return web.json_response({"entities": await batcher.predict(body["text"])})
+        texts = body.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise web.HTTPBadRequest(text=USAGE)
+        results = await asyncio.gather(*(batcher.predict(text) for text in texts))
+        return web.json_response({"entities": list(results)})
+
+    async def health(request):
+        return web.json_response({"status": "ok"})
+
+    async def stats(request):
+        return web.json_response(batcher.stats())
+
+    async def on_startup(app):
+        batcher.start()
+
+    async def on_cleanup(app):
+        await batcher.stop()
+
+    app = web.Application(client_max_size=16 << 20)
+    app.add_routes([web.post("/predict", predict), web.get("/health", health), web.get("/stats", stats)])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the PII NER model with dynamic micro-batching.")
+    parser.add_argument("--model", default="./pii-model", help="trained token-classification model directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of host:port")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="longest a request waits for others to share its batch")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads per forward pass")
+    args = parser.parse_args()
+
+    from aiohttp import web
+
+    if args.threads:
+        import torch
+
+        torch.set_num_threads(args.threads)
+    batcher = MicroBatcher(load_ner(args.model, args.threads), args.max_batch_size, args.max_wait_ms)
+    app = make_app(batcher)
+    if args.unix:
+        web.run_app(app, path=args.unix)
+    else:
+        web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Chunked redact_file must write exactly what whole-text RegexRedactor.redact() gives.
+
+    cd training && python -m pytest tests
+"""
+import random
+
+import pytest
+
+from redact_demon.redact import redact_file
+from redact_demon.regex_redactor import RegexRedactor
+
+
+def _long_url(rng):
+    path = "/".join("".join(rng.choices("abcdefgh0123456789-_", k=rng.randint(5, 30))) for _ in range(rng.randint(2, 6)))
+    return rng.choice(["http://", "https://", "", "www."]) + "www.example.com/" + path + "?q=" + "y" * rng.randint(0, 80)
+
+
+PIECES = [
+    _long_url,
+    lambda rng: f"jo.hn{rng.randint(0, 999)}@mail.example.org",
+    lambda rng: f"S{rng.randint(0, 9999999):07d}D",
+    lambda rng: f"+65 9{rng.randint(0, 999):03d} {rng.randint(0, 9999):04d}",
+    lambda rng: f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}",
+    lambda rng: "bearer " + "A" * rng.randint(15, 90),
+    lambda rng: "AKIA" + "B" * 16,
+    lambda rng: "00:1A:2B:3C:4D:5E",
+    lambda rng: "wörld",
+    lambda rng: "日本語テキスト",
+    lambda rng: "plain words here",
+]
+
+
+def _sample(seed, size=6000):
+    """Long lines of PII glued together, so chunks cut through matches longer than the chunk."""
+    rng = random.Random(seed)
+    lines, total = [], 0
+    while total < size:
+        line = "".join(rng.choice(["", " ", ", "]) + rng.choice(PIECES)(rng) for _ in range(rng.randint(20, 60)))
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("chunk_size", [7, 16, 50, 100, 257, 1024])
+def test_chunked_matches_whole_text(tmp_path, seed, chunk_size):
+    text = _sample(seed)
+    source, target = tmp_path / "in.txt", tmp_path / "out.txt"
+    source.write_text(text, encoding="utf-8")
+
+    redact_file(str(source), str(target), chunk_size=chunk_size, workers=1, progress=False)
+
+    assert target.read_text(encoding="utf-8") == RegexRedactor().redact(text)
+
+
+@pytest.mark.parametrize("chunk_size", range(5, 120, 3))
+def test_match_longer_than_context_across_chunk_start(tmp_path, chunk_size):
+    # The URL match runs on for ~150 bytes, past CONTEXT and past several chunk
+    # starts; scanning a chunk from inside it used to skip the MAC addresses the
+    # whole-text scan finds there
+    text = "+65 9432 6244www.example.com/" + "a1-" * 50 + "日本語テキストwww.www.example.com/x\n"
+    source, target = tmp_path / "in.txt", tmp_path / "out.txt"
+    source.write_text(text, encoding="utf-8")
+
+    redact_file(str(source), str(target), chunk_size=chunk_size, workers=1, progress=False)
+
+    assert target.read_text(encoding="utf-8") == RegexRedactor().redact(text)
+
+
+def test_workers_match_single_process(tmp_path):
+    text = _sample(2)
+    source = tmp_path / "in.txt"
+    source.write_text(text, encoding="utf-8")
+
+    redact_file(str(source), str(tmp_path / "one.txt"), chunk_size=64, workers=1, progress=False)
+    redact_file(str(source), str(tmp_path / "two.txt"), chunk_size=64, workers=2, progress=False)
+
+    assert (tmp_path / "one.txt").read_bytes() == (tmp_path / "two.txt").read_bytes()
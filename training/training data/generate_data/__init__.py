@@ -0,0 +1,6 @@
+"""Scripts that generate the raw names and addresses.
+
+Run them as modules from "training data", e.g. python -m generate_data.generate_name --count 10000.
+Faker, pypinyin, pandas and the scraping clients load on first use, so importing a
+module for its functions costs next to nothing.
+"""
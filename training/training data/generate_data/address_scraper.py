@@ -1,24 +1,124 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time, csv, random, threading
+import time, csv, os, random, threading, argparse, asyncio
 from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
 
 # --- CONFIG ---
 URL = "https://www.bestrandoms.com/random-address-in-sg"
 TOTAL_ADDRESSES = 6000
 NUM_WORKERS = 4
 DELAY = (3, 5)  # delay after actions
+CONCURRENCY = 16  # in-flight requests for the http backend
+MAX_RETRIES = 5
+FLUSH_EVERY = 100  # records between flushes of the output CSV
+FIELDNAMES = ["street", "zip_code"]
 
-# --- PROGRESS BAR ---
-progress_bar = tqdm(total=TOTAL_ADDRESSES, desc="Scraping", unit="addr")
 lock = threading.Lock()
 
 
-def scrape_addresses(chunk_size):
-    """Scrape 'chunk_size' addresses in one browser session"""
+# --- PARSING ---
+def parse_address_text(text):
+    """Pull street and zip code out of one entry's visible text."""
+    street, zip_code = "", ""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        for label in ("Street:", "Zip code:"):
+            if line.startswith(label):
+                value = line[len(label):].strip()
+                # Label and value may be separate text nodes
+                if not value and i + 1 < len(lines):
+                    value = lines[i + 1]
+                if label == "Street:":
+                    street = value
+                else:
+                    zip_code = value
+    return {"street": street, "zip_code": zip_code}
+
+
+def parse_addresses(html):
+    """Parse every li.col-sm-6 entry of a fetched page into street/zip_code records."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    return [parse_address_text(node.text(separator="\n")) for node in tree.css("li.col-sm-6")]
+
+
+# --- OUTPUT ---
+def address_key(record):
+    """Case- and whitespace-insensitive (street, zip code) used to spot repeats."""
+    street = " ".join(record["street"].lower().split())
+    return street, record["zip_code"].strip()
+
+
+def _drop_partial_line(path):
+    """Cut a half-written last row left behind by a crash, so appends start on a fresh line."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class AddressSink:
+    """Append unique records to the output CSV as they arrive.
+
+    The CSV itself is the persistent seen-set: with resume=True the existing
+    rows are read back, their keys seed the seen-set and count towards the
+    target, and new rows are appended after them.
+    """
+
+    def __init__(self, path, resume=False, flush_every=FLUSH_EVERY):
+        self.seen = set()
+        self.written = 0
+        self.duplicates = 0
+        self.flush_every = flush_every
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        resuming = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        if resuming:
+            _drop_partial_line(path)
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self.seen.add(address_key(row))
+            self.written = len(self.seen)
+
+        self._file = open(path, "a" if resuming else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDNAMES)
+        if not resuming:
+            self._writer.writeheader()
+
+    def add(self, record):
+        """Write the record unless it was seen before; return whether it was new."""
+        with self._lock:
+            key = address_key(record)
+            if key in self.seen:
+                self.duplicates += 1
+                return False
+            self.seen.add(key)
+            self._writer.writerow(record)
+            self.written += 1
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+            return True
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._file.close()
+
+
+# --- SELENIUM BACKEND ---
+def scrape_addresses(total, sink, progress_bar, url=URL):
+    """Scrape in one browser session until the sink holds 'total' unique addresses"""
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
     options = webdriver.ChromeOptions()
     options.add_argument("--headless=new")
     options.add_argument("--disable-blink-features=AutomationControlled")
@@ -26,59 +126,152 @@ def scrape_addresses(chunk_size):
     options.add_experimental_option("excludeSwitches", ["enable-logging"])
 
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    addresses = []
 
     try:
-        driver.get(URL)
+        driver.get(url)
         time.sleep(random.uniform(*DELAY))
 
-        while len(addresses) < chunk_size:
+        while sink.written < total:
             # Scrape all addresses currently on the page
             items = driver.find_elements(By.CSS_SELECTOR, "li.col-sm-6")
             for item in items:
-                text = item.text
-                street, zip_code = "", ""
-                for line in text.splitlines():
-                    if line.startswith("Street:"):
-                        street = line.replace("Street:", "").strip()
-                    elif line.startswith("Zip code:"):
-                        zip_code = line.replace("Zip code:", "").strip()
-                addresses.append({"street": street, "zip_code": zip_code})
-
-                # Update progress bar safely
-                with lock:
-                    progress_bar.update(1)
-
-                if len(addresses) >= chunk_size:
+                if sink.add(parse_address_text(item.text)):
+                    # Update progress bar safely
+                    with lock:
+                        progress_bar.update(1)
+
+                if sink.written >= total:
                     break
 
             # Refresh the page to get new addresses
-            if len(addresses) < chunk_size:
+            if sink.written < total:
                 driver.refresh()
                 time.sleep(random.uniform(*DELAY))
 
     finally:
         driver.quit()
 
-    return addresses
 
+def scrape_selenium(total, num_workers, sink, progress_bar, url=URL):
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(scrape_addresses, total, sink, progress_bar, url) for _ in range(num_workers)]
+        for f in futures:
+            f.result()
 
-# --- PARALLEL EXECUTION ---
-chunk_size = TOTAL_ADDRESSES // NUM_WORKERS
-all_addresses = []
 
-with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-    futures = [executor.submit(scrape_addresses, chunk_size) for _ in range(NUM_WORKERS)]
-    for f in futures:
-        all_addresses.extend(f.result())
+# --- HTTP BACKEND ---
+async def _fetch_page(session, url):
+    """GET one page, retrying transient failures with exponential backoff."""
+    import aiohttp
 
-progress_bar.close()
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES - 1:
+                raise
+            await asyncio.sleep(2 ** attempt)
+
+
+async def fetch_addresses(url=URL, concurrency=CONCURRENCY, delay=(0, 0)):
+    """Async generator of address records, fetching up to `concurrency` pages at a time.
+
+    Each fetch of the random-address page yields a fresh batch of entries, so
+    this runs until the caller stops iterating.
+    """
+    import aiohttp
+
+    queue = asyncio.Queue(maxsize=concurrency)
+
+    async def worker(session):
+        try:
+            while True:
+                html = await _fetch_page(session, url)
+                await queue.put(parse_addresses(html))
+                if delay[1]:
+                    await asyncio.sleep(random.uniform(*delay))
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:  # hand the failure to the consumer instead of dying silently
+            await queue.put(error)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; redact-demon address scraper)"}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            while True:
+                batch = await queue.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                for record in batch:
+                    yield record
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def scrape_http(total, sink, progress_bar, url=URL, concurrency=CONCURRENCY, delay=(0, 0)):
+    if sink.written >= total:
+        return
+    records = fetch_addresses(url, concurrency, delay)
+    try:
+        async for record in records:
+            if sink.add(record):
+                progress_bar.update(1)
+            if sink.written >= total:
+                break
+    finally:
+        await records.aclose()
+
+
+# --- MAIN ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape random Singapore addresses.")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="selenium",
+                        help="headless Chrome per worker, or pooled async HTTP requests")
+    parser.add_argument("--total", type=int, default=TOTAL_ADDRESSES)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="browsers for the selenium backend")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="in-flight requests for the http backend")
+    parser.add_argument("--delay", type=float, nargs=2, default=(0, 0), metavar=("MIN", "MAX"),
+                        help="pause in seconds after each page in the http backend")
+    parser.add_argument("--url", default=URL, help="page to fetch, e.g. a local server with recorded pages")
+    parser.add_argument("--output", default="addresses.csv")
+    parser.add_argument("--resume", action="store_true",
+                        help="keep the unique rows already in --output and scrape only the remainder")
+    parser.add_argument("--flush-every", type=int, default=FLUSH_EVERY, help="records between flushes to disk")
+    return parser.parse_args()
+
+
+def main():
+    from tqdm import tqdm
+
+    args = parse_args()
+
+    # --- OUTPUT, appended as we go ---
+    sink = AddressSink(args.output, resume=args.resume, flush_every=args.flush_every)
+    resumed = sink.written
+
+    # --- PROGRESS BAR ---
+    progress_bar = tqdm(total=args.total, initial=min(resumed, args.total), desc="Scraping", unit="addr")
+
+    # --- PARALLEL EXECUTION ---
+    try:
+        if args.backend == "http":
+            asyncio.run(scrape_http(args.total, sink, progress_bar, args.url, args.concurrency, tuple(args.delay)))
+        else:
+            scrape_selenium(args.total, args.workers, sink, progress_bar, args.url)
+    finally:
+        sink.close()
+        progress_bar.close()
 
-# --- SAVE TO CSV ---
-with open("addresses.csv", mode="w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=["street", "zip_code"])
-    writer.writeheader()
-    writer.writerows(all_addresses)
+    print(f"Saved {sink.written} unique addresses to {args.output} "
+          f"({resumed} resumed, {sink.duplicates} duplicates skipped)")
 
-print(f"Saved {len(all_addresses)} addresses to addresses.csv")
 
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
-from faker import Faker
-from faker.providers import BaseProvider
-from pypinyin import lazy_pinyin
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import random
-import pandas as pd
+import re
+import time
+import numpy as np
 
-# Set up Faker for English + Chinese
-fake_en = Faker("en_US")
-fake_cn = Faker("zh_CN")
+# ---------- Faker, loaded on first use ----------
+# Importing Faker and building a locale takes about a second, so nothing here
+# touches it until a name is generated. All instances draw from Faker's shared
+# generator, which Faker.seed() seeds.
+_fakers = {}
 
-# ---------- Malay Provider ----------
-class MalayNameProvider(BaseProvider):
+def faker(locale="en_US"):
+    """The Faker instance for locale, created on first use."""
+    if locale not in _fakers:
+        from faker import Faker
+        _fakers[locale] = Faker(locale)
+    return _fakers[locale]
+
+def lazy_pinyin(text):
+    """pypinyin.lazy_pinyin; pypinyin loads its dictionaries when first imported."""
+    from pypinyin import lazy_pinyin
+    return lazy_pinyin(text)
+
+# ---------- Malay Names ----------
+class MalayNames:
 
     male_first = [
         "Ahmad", "Mohd", "Muhammad", "Faiz", "Hafiz", "Rahman", "Azlan", "Syafiq",
@@ -42,18 +58,11 @@ class MalayNameProvider(BaseProvider):
     ]
 
 
-    def malay_name(self):
-        if random.random() < 0.5:  # male
-            first = self.random_element(self.male_first)
-            father = self.random_element(self.father_names)
-            return f"{first} bin {father}"
-        else:  # female
-            first = self.random_element(self.female_first)
-            father = self.random_element(self.father_names)
-            return f"{first} binti {father}"
+def malay_name():
+    return _parent_name(MalayNames, faker().random_element, "bin", "binti")
 
-# ---------- Tamil Provider ----------
-class TamilNameProvider(BaseProvider):
+# ---------- Tamil Names ----------
+class TamilNames:
 
     male_first = [
         "Arun", "Kumar", "Rajesh", "Suresh", "Vijay", "Mani", "Ravi", "Shankar",
@@ -84,15 +93,50 @@ class TamilNameProvider(BaseProvider):
     ]
 
 
-    def tamil_name(self):
-        if random.random() < 0.5:  # male
-            first = self.random_element(self.male_first)
-            father = self.random_element(self.father_names)
-            return f"{first} s/o {father}"
-        else:  # female
-            first = self.random_element(self.female_first)
-            father = self.random_element(self.father_names)
-            return f"{first} d/o {father}"
+def tamil_name():
+    return _parent_name(TamilNames, faker().random_element, "s/o", "d/o")
+
+def _parent_name(names, random_element, male_link, female_link):
+    """First name, bin/binti (s/o, d/o), father's name; 50/50 gender."""
+    if random.random() < 0.5:  # male
+        first = random_element(names.male_first)
+        father = random_element(names.father_names)
+        return f"{first} {male_link} {father}"
+    else:  # female
+        first = random_element(names.female_first)
+        father = random_element(names.father_names)
+        return f"{first} {female_link} {father}"
+
+# ---------- Faker Providers ----------
+# MalayNameProvider and TamilNameProvider are the Faker providers this script
+# has always offered (fake.add_provider(MalayNameProvider); fake.malay_name()),
+# over the same tables. They subclass Faker's BaseProvider, so they are built
+# on first access rather than when the module is imported.
+_providers = {}
+
+def _provider_classes():
+    if not _providers:
+        from faker.providers import BaseProvider
+
+        class MalayNameProvider(BaseProvider, MalayNames):
+            __qualname__ = "MalayNameProvider"
+
+            def malay_name(self):
+                return _parent_name(self, self.random_element, "bin", "binti")
+
+        class TamilNameProvider(BaseProvider, TamilNames):
+            __qualname__ = "TamilNameProvider"
+
+            def tamil_name(self):
+                return _parent_name(self, self.random_element, "s/o", "d/o")
+
+        _providers.update(MalayNameProvider=MalayNameProvider, TamilNameProvider=TamilNameProvider)
+    return _providers
+
+def __getattr__(name):
+    if name in ("MalayNameProvider", "TamilNameProvider"):
+        return _provider_classes()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------- Helper for Pinyin ----------
 def format_pinyin(name):
@@ -100,31 +144,30 @@ def format_pinyin(name):
 
 # ---------- Chinese Names ----------
 def sg_chinese_name(mixed=True):
-    cn = fake_cn.name()      # e.g. 陈小明
+    cn = faker("zh_CN").name()      # e.g. 陈小明
     surname = cn[0]          # 陈
     given = cn[1:]           # 小明
     surname_pinyin = lazy_pinyin(surname)[0].capitalize()
     given_pinyin = " ".join(w.capitalize() for w in lazy_pinyin(given))
     
     if mixed:  # Mixed English + Chinese
-        eng = fake_en.first_name()
+        eng = faker("en_US").first_name()
         return f"{eng} {surname_pinyin} {given_pinyin}"
     else:      # Pure Chinese in Pinyin
         return f"{surname_pinyin} {given_pinyin}"
 
 # ---------- English Names ----------
 def sg_english_name():
-    return fake_en.name()
+    return faker("en_US").name()
 
 # ---------- Combine All ----------
-fake = Faker()
-fake.add_provider(MalayNameProvider)
-fake.add_provider(TamilNameProvider)
+GROUPS = ["chinese_mixed", "chinese_pure", "malay", "tamil", "english"]
+GROUP_WEIGHTS = [40, 20, 15, 10, 15]  # adjust proportions
 
 def sg_name():
     group = random.choices(
-        ["chinese_mixed", "chinese_pure", "malay", "tamil", "english"],
-        weights=[40, 20, 15, 10, 15],  # adjust proportions
+        GROUPS,
+        weights=GROUP_WEIGHTS,
         k=1
     )[0]
 
@@ -133,16 +176,239 @@ def sg_name():
     elif group == "chinese_pure":
         return sg_chinese_name(mixed=False)
     elif group == "malay":
-        return fake.malay_name()
+        return malay_name()
     elif group == "tamil":
-        return fake.tamil_name()
+        return tamil_name()
     else:
         return sg_english_name()
 
-names = [sg_name() for _ in range(200)]  
+# ---------- Bulk Generation ----------
+def _weighted(elements):
+    """Split a Faker element list/OrderedDict into (values, probabilities)."""
+    if isinstance(elements, dict):
+        weights = np.array(list(elements.values()), dtype=float)
+        return np.array(list(elements), dtype=object), weights / weights.sum()
+    return np.array(elements, dtype=object), None
+
+# Faker person fields used by the en_US name formats -> the element lists behind them
+ENGLISH_FIELDS = {
+    "first_name_male": "first_names_male",
+    "first_name_female": "first_names_female",
+    "last_name": "last_names",
+    "prefix_male": "prefixes_male",
+    "prefix_female": "prefixes_female",
+    "suffix_male": "suffixes_male",
+    "suffix_female": "suffixes_female",
+}
+
+class NameTables:
+    """Everything the bulk generator looks up, built once and shared with every worker.
+
+    Pinyin is computed up front for every surname character and every given name
+    the zh_CN provider can produce (given names of compound surnames keep the
+    surname's second character, exactly as sg_chinese_name splits them), so
+    bulk names never call lazy_pinyin.
+    """
+
+    def __init__(self):
+        from faker.providers.person.en_US import Provider as EnPersonProvider
+        from faker.providers.person.zh_CN import Provider as CnPersonProvider
+
+        self.surnames, self.surname_p = _weighted(CnPersonProvider.last_names)
+        self.given_names, _ = _weighted(CnPersonProvider.first_names)
+        self.english_first, self.english_first_p = _weighted(EnPersonProvider.first_names)
+        # en_US name formats ("{{prefix_male}} {{first_name_male}} {{last_name}}", ...) and their fields
+        self.english_formats, self.english_format_p = _weighted(EnPersonProvider.formats)
+        self.english_fields = {field: _weighted(getattr(EnPersonProvider, attr))
+                               for field, attr in ENGLISH_FIELDS.items()}
+
+        char_pinyin = {}
+        given_pinyin = {}
+        # surname_pinyin[s] and given_pinyin[s, g] for surname s + given name g
+        self.surname_pinyin = np.empty(len(self.surnames), dtype=object)
+        self.given_pinyin = np.empty((len(self.surnames), len(self.given_names)), dtype=object)
+        for s, surname in enumerate(self.surnames):
+            head, tail = surname[0], surname[1:]
+            if head not in char_pinyin:
+                char_pinyin[head] = lazy_pinyin(head)[0].capitalize()
+            self.surname_pinyin[s] = char_pinyin[head]
+            for g, given in enumerate(self.given_names):
+                key = tail + given
+                if key not in given_pinyin:
+                    given_pinyin[key] = " ".join(w.capitalize() for w in lazy_pinyin(key))
+                self.given_pinyin[s, g] = given_pinyin[key]
+
+def _chinese_batch(n, rng, tables, mixed):
+    s = rng.choice(len(tables.surnames), size=n, p=tables.surname_p)
+    g = rng.integers(len(tables.given_names), size=n)
+    names = tables.surname_pinyin[s] + " " + tables.given_pinyin[s, g]
+    if mixed:  # Mixed English + Chinese
+        eng = _draw(rng, n, tables.english_first, tables.english_first_p)
+        names = eng + " " + names
+    return names
+
+def _draw(rng, n, values, p):
+    return values[rng.choice(len(values), size=n, p=p)]
+
+def _english_batch(n, rng, tables):
+    """Vectorized fake_en.name(): pick a weighted format per row, then fill each field."""
+    fmt = rng.choice(len(tables.english_formats), size=n, p=tables.english_format_p)
+    names = np.empty(n, dtype=object)
+    for f, pattern in enumerate(tables.english_formats):
+        rows = fmt == f
+        k = int(rows.sum())
+        # re.split with a capture group alternates literal text and field names
+        parts = re.split(r"\{\{(\w+)\}\}", pattern)
+        out = np.full(k, "", dtype=object)
+        for i, part in enumerate(parts):
+            out = out + (_draw(rng, k, *tables.english_fields[part]) if i % 2 else part)
+        names[rows] = out
+    return names
+
+def _bin_batch(n, rng, names, male_link, female_link):
+    """Vectorized malay_name/tamil_name: 50/50 gender, uniform first and father names."""
+    male = rng.random(n) < 0.5
+    male_first = np.array(names.male_first, dtype=object)[rng.integers(len(names.male_first), size=n)]
+    female_first = np.array(names.female_first, dtype=object)[rng.integers(len(names.female_first), size=n)]
+    father = np.array(names.father_names, dtype=object)[rng.integers(len(names.father_names), size=n)]
+    return np.where(male, male_first + f" {male_link} ", female_first + f" {female_link} ") + father
+
+def sg_names_batch(n, rng, tables):
+    """Generate n names with the same group mix and per-group distributions as sg_name()."""
+    p = np.array(GROUP_WEIGHTS, dtype=float) / sum(GROUP_WEIGHTS)
+    groups = rng.choice(len(GROUPS), size=n, p=p)
+    names = np.empty(n, dtype=object)
+    builders = {
+        "chinese_mixed": lambda k: _chinese_batch(k, rng, tables, mixed=True),
+        "chinese_pure": lambda k: _chinese_batch(k, rng, tables, mixed=False),
+        "malay": lambda k: _bin_batch(k, rng, MalayNames, "bin", "binti"),
+        "tamil": lambda k: _bin_batch(k, rng, TamilNames, "s/o", "d/o"),
+        "english": lambda k: _english_batch(k, rng, tables),
+    }
+    for i, group in enumerate(GROUPS):
+        rows = groups == i
+        names[rows] = builders[group](int(rows.sum()))
+    return names
+
+_tables = None
+
+def _init_worker(tables):
+    global _tables
+    _tables = tables
+
+def _generate_batch(task):
+    seed, index, size = task
+    return sg_names_batch(size, np.random.default_rng([seed, index]), _tables).tolist()
+
+def _ordered_map(executor, fn, tasks, window):
+    """executor.map that keeps only `window` tasks in flight, so `tasks` may be endless."""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def generate_bulk(count, seed, workers=1, batch_size=50_000, distinct=False):
+    """Yield lists of names, one per batch, until `count` names have been produced.
+
+    Batch i is always generated from (seed, i), so the output does not depend on
+    the number of workers. With distinct=True repeats are dropped and extra
+    batches are generated until the target is reached.
+    """
+    tables = NameTables()
+    seen = set() if distinct else None
+    produced = 0
+
+    def tasks():
+        index = 0
+        while True:
+            yield seed, index, batch_size
+            index += 1
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tables,)) if workers > 1 else None
+    if executor is None:
+        _init_worker(tables)
+        batches = map(_generate_batch, tasks())
+    else:
+        batches = _ordered_map(executor, _generate_batch, tasks(), window=2 * workers)
+    try:
+        for batch in batches:
+            if seen is not None:
+                fresh = []
+                for name in batch:
+                    if name not in seen:
+                        seen.add(name)
+                        fresh.append(name)
+                if not fresh:
+                    print(f"No new distinct names in the last batch; stopping at {produced}")
+                    return
+                batch = fresh
+            batch = batch[:count - produced]
+            produced += len(batch)
+            yield batch
+            if produced >= count:
+                return
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def write_names(batches, output):
+    """Stream batches of names to CSV, or Parquet if the output ends in .parquet."""
+    total = 0
+    if output.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(output, pa.schema([("name", pa.string())])) as writer:
+            for batch in batches:
+                writer.write_table(pa.table({"name": batch}))
+                total += len(batch)
+        return total
+
+    import pandas as pd
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        for i, batch in enumerate(batches):
+            pd.DataFrame(batch, columns=["name"]).to_csv(f, index=False, header=(i == 0))
+            total += len(batch)
+    return total
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate Singapore-style names.")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--output", default="sg_names.csv", help=".csv or .parquet")
+    parser.add_argument("--bulk", action="store_true",
+                        help="vectorized batches with precomputed pinyin, streamed to the output")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes in --bulk mode")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--distinct", action="store_true", help="drop repeated names in --bulk mode")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.bulk:
+        seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2**32)
+        started = time.perf_counter()
+        batches = generate_bulk(args.count, seed, args.workers, args.batch_size, args.distinct)
+        total = write_names(batches, args.output)
+        elapsed = time.perf_counter() - started
+        print(f"Saved {args.output} with {total} names in {elapsed:.1f}s ({total / elapsed:,.0f} names/sec, seed {seed})")
+        return
+
+    random.seed(args.seed)
+    if args.seed is not None:
+        from faker import Faker
+        Faker.seed(args.seed)  # the Faker instances draw from their own generator
+    names = [sg_name() for _ in range(args.count)]
+
+    # Save to CSV
+    import pandas as pd
+    df = pd.DataFrame(names, columns=["name"])
+    df.to_csv(args.output, index=False, encoding="utf-8")
 
-# Save to CSV
-df = pd.DataFrame(names, columns=["name"])
-df.to_csv("sg_names.csv", index=False, encoding="utf-8")
+    print("Saved", args.output, "with", len(names), "names")
 
-print("Saved sg_names.csv with", len(names), "names")
+if __name__ == "__main__":
+    main()
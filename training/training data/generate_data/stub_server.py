@@ -0,0 +1,150 @@
+"""Local stand-in for the random-address site, serving saved listing pages.
+
+    python -m generate_data.stub_server --port 8000
+    python -m generate_data.address_scraper --backend http --url http://127.0.0.1:8000/random-address-in-sg
+
+Every request gets the next page of fixtures/ in turn, the way each refresh of
+the live page gives a new batch. The pages repeat one address across pages
+(differing only in case and spacing), so the scraper's de-duplication is
+exercised too.
+
+    python -m generate_data.stub_server --check
+
+runs parse_addresses over the pages, then the http backend against the
+stand-in, once from scratch and once resuming from a CSV cut off mid-row.
+"""
+import argparse, asyncio, csv, itertools, os, tempfile
+from pathlib import Path
+
+from .address_scraper import AddressSink, address_key, parse_addresses, scrape_http
+
+# --- CONFIG ---
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+PATH = "/random-address-in-sg"
+HOST = "127.0.0.1"
+PORT = 8000
+
+
+def load_pages(directory=FIXTURES_DIR):
+    """Saved listing pages, in name order."""
+    pages = [p.read_text(encoding="utf-8") for p in sorted(Path(directory).glob("*.html"))]
+    if not pages:
+        raise FileNotFoundError(f"no .html pages in {directory}")
+    return pages
+
+
+def make_app(pages):
+    """aiohttp app answering every GET with the next page in rotation."""
+    from aiohttp import web
+
+    rotation = itertools.cycle(pages)
+
+    async def page(request):
+        return web.Response(text=next(rotation), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", page)
+    return app
+
+
+async def start(pages, host=HOST, port=PORT):
+    """Start the stand-in and return (runner, base url); port 0 picks a free port."""
+    from aiohttp import web
+
+    runner = web.AppRunner(make_app(pages))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}{PATH}"
+
+
+# --- CHECK ---
+class _NoProgress:
+    def update(self, n=1):
+        pass
+
+
+def _read_keys(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [address_key(row) for row in csv.DictReader(f)]
+
+
+async def _scrape(url, path, total, resume):
+    sink = AddressSink(path, resume=resume, flush_every=1)
+    try:
+        await scrape_http(total, sink, _NoProgress(), url, concurrency=2)
+    finally:
+        sink.close()
+    return sink
+
+
+async def check(pages):
+    # Parsing: every entry of every page has a street and a zip code
+    parsed = [parse_addresses(html) for html in pages]
+    for i, records in enumerate(parsed):
+        assert records, f"page {i} has no entries"
+        for record in records:
+            assert record["street"] and record["zip_code"].isdigit(), f"page {i}: bad entry {record}"
+    keys = [address_key(r) for records in parsed for r in records]
+    unique = list(dict.fromkeys(keys))
+    print(f"parse_addresses: {len(keys)} entries on {len(pages)} pages, {len(unique)} unique")
+
+    runner, url = await start(pages, port=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # From scratch: every unique address once, nothing else
+            path = os.path.join(tmp, "addresses.csv")
+            sink = await _scrape(url, path, len(unique), resume=False)
+            written = _read_keys(path)
+            assert sorted(written) == sorted(unique), f"scraped {written}, expected {unique}"
+            print(f"scrape: {sink.written} written, {sink.duplicates} duplicates skipped")
+
+            # Resume: keep the complete rows, drop the half-written one, add only the rest
+            with open(path, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+            kept = 3
+            with open(path, "wb") as f:
+                f.writelines(lines[:1 + kept])
+                f.write(lines[1 + kept][:5])
+            sink = await _scrape(url, path, len(unique), resume=True)
+            resumed = _read_keys(path)
+            assert resumed[:kept] == written[:kept], "resume rewrote the rows already on disk"
+            assert sorted(resumed) == sorted(unique), f"resumed to {resumed}, expected {unique}"
+            print(f"resume: {kept} kept, {sink.written - kept} added, {sink.duplicates} duplicates skipped")
+    finally:
+        await runner.cleanup()
+    print("ok")
+
+
+async def serve(pages, host, port):
+    runner, url = await start(pages, host, port)
+    print(f"Serving {len(pages)} saved pages at {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+# --- MAIN ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve saved random-address pages for the scraper.")
+    parser.add_argument("--pages", default=str(FIXTURES_DIR), help="directory of saved .html listing pages")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--check", action="store_true",
+                        help="check parse_addresses and a scrape with resume against the pages, then exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pages = load_pages(args.pages)
+    try:
+        asyncio.run(check(pages) if args.check else serve(pages, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
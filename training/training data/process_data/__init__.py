@@ -0,0 +1,6 @@
+"""Scripts that turn names and addresses into labelled CoNLL corpora.
+
+Run them as modules from "training data", e.g. python -m process_data.combine_name_address --seed 0.
+The modules import only the standard library and NumPy at load time; pandas and NLTK
+load on first use, so worker processes start quickly.
+"""
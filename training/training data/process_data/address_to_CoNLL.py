@@ -1,11 +1,34 @@
-import pandas as pd
-import nltk
+import numpy as np
+import argparse
 import random
-nltk.download("punkt")
-nltk.download("punkt_tab")  
+from functools import lru_cache
 
-# Load CSV
-df = pd.read_csv("augmented_addresses.csv")
+from .span_matcher import kmp_search
+
+BATCH_SIZE = 10_000  # sentences tokenized and labelled together
+
+# NLTK takes seconds to import, so it is loaded on first use
+@lru_cache(maxsize=None)
+def _nltk():
+    """Import NLTK without moving the global random generator, which its import draws from."""
+    state = random.getstate()
+    import nltk
+    random.setstate(state)
+    return nltk
+
+@lru_cache(maxsize=None)
+def span_tokenizer():
+    """The word tokenizer nltk.word_tokenize runs on each sentence."""
+    return _nltk().tokenize.NLTKWordTokenizer()
+
+@lru_cache(maxsize=None)
+def ensure_nltk_data(resource):
+    """Download an NLTK tokenizer resource unless it is installed; checked once per process."""
+    nltk = _nltk()
+    try:
+        nltk.data.find(f"tokenizers/{resource}")
+    except LookupError:
+        nltk.download(resource, quiet=True)
 
 # Sentence templates
 templates = [
@@ -16,27 +39,102 @@ templates = [
     "Our office is located at {}, Singapore."
 ]
 
-# Open file to write CoNLL
-with open("addresses_context_conll.txt", "w", encoding="utf-8") as f:
-    for addr in df["augmented"]:
-        # Pick a random template
-        sentence = random.choice(templates).format(addr)
-        tokens = nltk.word_tokenize(sentence)
-        
-        # Tokenize the address
-        addr_tokens = nltk.word_tokenize(addr)
-        len_addr = len(addr_tokens)
-        
-        i = 0
-        while i < len(tokens):
-            # Check if the slice matches the address tokens
-            if tokens[i:i+len_addr] == addr_tokens:
-                for j, t in enumerate(addr_tokens):
-                    label = "B-PII" if j == 0 else "I-PII"
-                    f.write(f"{t} {label}\n")
-                i += len_addr  # skip past the address tokens
-            else:
-                f.write(f"{tokens[i]} O\n")
-                i += 1
-        f.write("\n")
+def address_to_conll(addr):
+    """CoNLL lines ("token label") for addr placed in a random template sentence."""
+    word_tokenize = _nltk().word_tokenize
+
+    # Pick a random template
+    sentence = random.choice(templates).format(addr)
+    tokens = word_tokenize(sentence)
+
+    # Tokenize the address
+    addr_tokens = word_tokenize(addr)
+    len_addr = len(addr_tokens)
+
+    # Leftmost non-overlapping address occurrences, found in one pass
+    addr_starts = set(kmp_search(tokens, addr_tokens, overlapping=False))
+
+    lines = []
+    i = 0
+    while i < len(tokens):
+        if i in addr_starts:
+            for j, t in enumerate(addr_tokens):
+                label = "B-PII" if j == 0 else "I-PII"
+                lines.append(f"{t} {label}\n")
+            i += len_addr  # skip past the address tokens
+        else:
+            lines.append(f"{tokens[i]} O\n")
+            i += 1
+    return "".join(lines)
+
+def place_address(addr):
+    """(sentence, start, end): addr in a random template sentence, and where it sits in it."""
+    prefix, suffix = random.choice(templates).split("{}")
+    addr = str(addr)
+    return prefix + addr + suffix, len(prefix), len(prefix) + len(addr)
+
+def addresses_to_conll(addresses, batch_size=BATCH_SIZE):
+    """Yield the CoNLL block of each address, blank separator line included, a batch at a time.
+
+    Each sentence is tokenized once, with character spans. The address's
+    span is known from the template, so a token overlapping it is PII: the
+    first one B-PII, the rest I-PII. Nothing has to be found again after
+    tokenizing, so the labels hold even where the template's punctuation
+    sticks to the address. Tokens are written as they appear in the text.
+    """
+    addresses = list(addresses)
+    tokenizer = span_tokenizer()
+    for b in range(0, len(addresses), batch_size):
+        placed = [place_address(addr) for addr in addresses[b:b + batch_size]]
+        spans = [list(tokenizer.span_tokenize(sentence)) for sentence, _, _ in placed]
+
+        # Label every token of the batch at once
+        counts = np.fromiter(map(len, spans), dtype=np.int64, count=len(spans))
+        flat = np.array([span for row in spans for span in row], dtype=np.int64).reshape(-1, 2)
+        sentence_of = np.repeat(np.arange(len(placed)), counts)
+        addr_start = np.array([start for _, start, _ in placed], dtype=np.int64)[sentence_of]
+        addr_end = np.array([end for _, _, end in placed], dtype=np.int64)[sentence_of]
+        pii = (flat[:, 0] < addr_end) & (flat[:, 1] > addr_start)
+        first = np.zeros(len(flat), dtype=bool)
+        first[np.cumsum(counts)[:-1][counts[1:] > 0]] = True
+        first[:1] = True
+        begin = pii & (first | ~np.roll(pii, 1))
+        labels = np.where(begin, "B-PII", np.where(pii, "I-PII", "O"))
+
+        k = 0
+        for (sentence, _, _), row in zip(placed, spans):
+            yield "".join(f"{sentence[start:end]} {label}\n" for (start, end), label in zip(row, labels[k:k + len(row)])) + "\n"
+            k += len(row)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Place augmented addresses in template sentences as CoNLL.")
+    parser.add_argument("--input", default="augmented_addresses.csv", help="CSV with an augmented column")
+    parser.add_argument("--output", default="addresses_context_conll.txt")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="sentences labelled together")
+    parser.add_argument("--word-tokenize", action="store_true",
+                        help="old path: nltk.word_tokenize the sentence and the address, then search for the address")
+    return parser.parse_args()
+
+def main():
+    import pandas as pd
+
+    args = parse_args()
+    random.seed(args.seed)
+
+    # Load CSV
+    df = pd.read_csv(args.input)
+
+    # Open file to write CoNLL
+    with open(args.output, "w", encoding="utf-8") as f:
+        if not args.word_tokenize:
+            f.writelines(addresses_to_conll(df["augmented"], args.batch_size))
+            return
+        ensure_nltk_data("punkt")
+        ensure_nltk_data("punkt_tab")
+        for addr in df["augmented"]:
+            f.write(address_to_conll(addr))
+            f.write("\n")
 
+if __name__ == "__main__":
+    main()
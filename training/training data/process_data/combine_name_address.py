@@ -1,15 +1,32 @@
-import pandas as pd
+import argparse
+import os
 import random
-import string
+import tempfile
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+
+from .dedup import Deduplicator, make_index
+from .sampler import BalancedStream
+from .templates import compile_templates
 
 # -------------------------
 # Load Data
 # -------------------------
-addresses = pd.read_csv(r".\training\training data\augmented_addresses.csv")
-names = pd.read_csv(r".\training\training data\sg_names.csv")
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+ADDRESSES_CSV = os.path.join(DATA_DIR, "augmented_addresses.csv")
+NAMES_CSV = os.path.join(DATA_DIR, "sg_names.csv")
+OUTPUT_FILE = "synthetic_contextual_balanced.conll"
 
-address_list = addresses["augmented"].dropna().tolist()
-name_list = names["name"].dropna().tolist()
+def load_data(addresses_csv=ADDRESSES_CSV, names_csv=NAMES_CSV):
+    """Return (name_list, address_list) read from the generated CSVs."""
+    import pandas as pd
+
+    addresses = pd.read_csv(addresses_csv)
+    names = pd.read_csv(names_csv)
+    return names["name"].dropna().tolist(), addresses["augmented"].dropna().tolist()
 
 NAME_PREFIXES = ["Dr.", "Mr.", "Ms.", "Mrs.", "Prof.", "Sir", "Madam"]
 
@@ -337,58 +354,17 @@ NONPII_TEMPLATES = {
 # -------------------------
 # Helper functions
 # -------------------------
-def normalize_token(tok):
-    """Lowercase and strip punctuation for reliable matching."""
-    return tok.lower().strip(string.punctuation)
-
-def match_span(tokens, span_tokens):
-    """Find start index of span_tokens in tokens, ignoring punctuation/case."""
-    span_tokens_norm = [normalize_token(t) for t in span_tokens]
-    for i in range(len(tokens) - len(span_tokens) + 1):
-        window = [normalize_token(t) for t in tokens[i:i+len(span_tokens)]]
-        if window == span_tokens_norm:
-            return i
-    return -1
-
-def sentence_to_conll(sentence, name=None, address=None, pii=True):
-    tokens = sentence.split()
-    labels = ["O"] * len(tokens)
-    pii_flags = ["PII" if pii else "NONPII"] * len(tokens)
-
-    # Label PER
-    if name:
-        name_tokens = name.split()
-        for prefix in NAME_PREFIXES:
-            full_name_tokens = (prefix.split() + name_tokens) if sentence.find(prefix) != -1 else name_tokens
-            start_idx = match_span(tokens, full_name_tokens)
-            if start_idx != -1:
-                labels[start_idx] = "B-PER"
-                pii_flags[start_idx] = "PII" if pii else "NONPII"
-                for j in range(1, len(full_name_tokens)):
-                    labels[start_idx + j] = "I-PER"
-                    pii_flags[start_idx + j] = "PII" if pii else "NONPII"
-                break
-        else:  # no prefix matched
-            start_idx = match_span(tokens, name_tokens)
-            if start_idx != -1:
-                labels[start_idx] = "B-PER"
-                pii_flags[start_idx] = "PII" if pii else "NONPII"
-                for j in range(1, len(name_tokens)):
-                    labels[start_idx + j] = "I-PER"
-                    pii_flags[start_idx + j] = "PII" if pii else "NONPII"
-
-    # Label LOC
-    if address:
-        addr_tokens = address.split()
-        start_idx = match_span(tokens, addr_tokens)
-        if start_idx != -1:
-            labels[start_idx] = "B-LOC"
-            pii_flags[start_idx] = "PII" if pii else "NONPII"
-            for j in range(1, len(addr_tokens)):
-                labels[start_idx + j] = "I-LOC"
-                pii_flags[start_idx + j] = "PII" if pii else "NONPII"
-
-    return "\n".join([f"{tok}\t{lab}\t{flag}" for tok, lab, flag in zip(tokens, labels, pii_flags)]) + "\n"
+SLOT_TAGS = {"name": "PER", "address": "LOC"}
+
+# Compiled once; an honorific right before {name} is part of the PER span
+COMPILED_PII = compile_templates(PII_TEMPLATES, SLOT_TAGS, {"name": NAME_PREFIXES})
+COMPILED_NONPII = compile_templates(NONPII_TEMPLATES, SLOT_TAGS, {"name": NAME_PREFIXES})
+
+def template_to_conll(template, name=None, address=None, pii=True):
+    """CoNLL lines ("token\tlabel\tflag") for a compiled template filled with name and address."""
+    tokens, labels = template.fill({"name": name or "", "address": address or ""})
+    flag = "PII" if pii else "NONPII"
+    return "".join([f"{tok}\t{lab}\t{flag}\n" for tok, lab in zip(tokens, labels)])
 
 # -------------------------
 # Balanced Dataset Generation
@@ -397,36 +373,251 @@ TOTAL_SENTENCES = 12000
 SCENARIOS = ["per", "loc", "per_loc"]
 TYPES = ["pii", "non_pii"]
 
-num_per_combo = TOTAL_SENTENCES // (len(SCENARIOS) * len(TYPES))  # 12000/6 = 2000
+CHUNK_SIZE = 10_000  # sentences per work unit; fixed so the output never depends on --workers
+
+def generate_combo(name_list, address_list, scenario, ttype, count, rng):
+    """Yield `count` CoNLL sentences for one (scenario, type) combo."""
+    for _ in range(count):
+        name = rng.choice(name_list)
+        address = rng.choice(address_list)
+        template = rng.choice(compiled_templates(scenario, ttype))
+        yield template_to_conll(template, name=name, address=address, pii=ttype=="pii")
+
+def plan_chunks(num_per_combo, seed, chunk_size=CHUNK_SIZE):
+    """Split every combo into (scenario, type, count, chunk_seed) work units.
+
+    Each unit gets its own seed derived from the base seed and its position, so
+    a unit produces the same sentences no matter which worker runs it.
+    """
+    for scenario in SCENARIOS:
+        for ttype in TYPES:
+            for index, start in enumerate(range(0, num_per_combo, chunk_size)):
+                count = min(chunk_size, num_per_combo - start)
+                yield scenario, ttype, count, f"{seed}-{scenario}-{ttype}-{index}"
+
+def compiled_templates(scenario, ttype):
+    return COMPILED_PII[scenario] if ttype=="pii" else COMPILED_NONPII[scenario]
+
+def plan_corpus(num_names, num_addresses, num_per_combo, seed, chunk_size=CHUNK_SIZE):
+    """Split every combo into (scenario, type, name_idx, address_idx, template_idx) work units.
+
+    Unlike plan_chunks, the indices come from balanced streams: one name
+    stream shared, in plan order, by the combos whose templates have a {name}
+    slot, the same for addresses, and one template stream per combo. Every
+    name and address is then used within one time of every other, and every
+    template within one time of the others in its list. Each unit's indices
+    are drawn only when it is reached, so memory does not grow with the
+    corpus. Index arrays are None for a slot the combo's templates do not have.
+    """
+    rng = np.random.default_rng(seed)
+    names = BalancedStream(num_names, rng)
+    addresses = BalancedStream(num_addresses, rng)
+    for scenario in SCENARIOS:
+        for ttype in TYPES:
+            templates = compiled_templates(scenario, ttype)
+            slots = set().union(*(t.slots for t in templates))
+            template_stream = BalancedStream(len(templates), rng)
+            for start in range(0, num_per_combo, chunk_size):
+                count = min(chunk_size, num_per_combo - start)
+                yield (scenario, ttype,
+                       names.take(count) if "name" in slots else None,
+                       addresses.take(count) if "address" in slots else None,
+                       template_stream.take(count))
+
+def generate_planned(name_list, address_list, scenario, ttype, name_idx, address_idx, template_idx):
+    """Yield one CoNLL sentence per planned (name, address, template) index triple."""
+    templates = compiled_templates(scenario, ttype)
+    count = len(template_idx)
+    names = [name_list[i] for i in name_idx.tolist()] if name_idx is not None else [None] * count
+    addresses = [address_list[i] for i in address_idx.tolist()] if address_idx is not None else [None] * count
+    for name, address, t in zip(names, addresses, template_idx.tolist()):
+        yield template_to_conll(templates[t], name=name, address=address, pii=ttype=="pii")
+
+_worker_data = None
+
+def _init_worker(name_list, address_list):
+    global _worker_data
+    _worker_data = (name_list, address_list)
+
+def _generate_chunk(task):
+    scenario, ttype, count, chunk_seed = task
+    name_list, address_list = _worker_data
+    return list(generate_combo(name_list, address_list, scenario, ttype, count, random.Random(chunk_seed)))
+
+def _generate_planned_chunk(task):
+    name_list, address_list = _worker_data
+    return list(generate_planned(name_list, address_list, *task))
 
-conll_data = []
+def generate_conll(name_list, address_list, num_per_combo, seed, workers=1, sampling="random"):
+    """Yield CoNLL sentences for every combo in plan order, optionally across a process pool.
 
-for scenario in SCENARIOS:
-    for ttype in TYPES:
-        for _ in range(num_per_combo):
-            name = random.choice(name_list)
-            address = random.choice(address_list)
-            template = random.choice(PII_TEMPLATES[scenario] if ttype=="pii" else NONPII_TEMPLATES[scenario])
-            sentence = template.format(name=name, address=address)
-            pii_flag = True if ttype=="pii" else False
+    sampling="random" draws every sentence with random.choice, as
+    plan_chunks and generate_combo always did; "balanced" follows plan_corpus.
+    """
+    if sampling == "balanced":
+        tasks, work = plan_corpus(len(name_list), len(address_list), num_per_combo, seed), _generate_planned_chunk
+    else:
+        tasks, work = plan_chunks(num_per_combo, seed), _generate_chunk
+    if workers <= 1:
+        _init_worker(name_list, address_list)
+        for task in tasks:
+            yield from work(task)
+        return
 
-            if scenario == "per":
-                conll_sentence = sentence_to_conll(sentence, name=name, pii=pii_flag)
-            elif scenario == "loc":
-                conll_sentence = sentence_to_conll(sentence, address=address, pii=pii_flag)
-            else:
-                conll_sentence = sentence_to_conll(sentence, name=name, address=address, pii=pii_flag)
+    # Keep a few chunks in flight rather than handing the pool the whole plan
+    # (as imap would), so neither planned indices nor finished sentences pile up
+    with Pool(workers, initializer=_init_worker, initargs=(name_list, address_list)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(work, (task,)))
+            if len(pending) > 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
 
-            conll_data.append(conll_sentence)
+# -------------------------
+# Streaming shuffle + sharded output
+# -------------------------
+def shard_path(output, index):
+    """synthetic.conll -> synthetic-00003.conll"""
+    stem, ext = os.path.splitext(output)
+    return f"{stem}-{index:05d}{ext}"
+
+class ShardWriter:
+    """Write CoNLL sentences to fixed-size shard files, rolling over as each one fills."""
+
+    def __init__(self, output, shard_size):
+        self.output = output
+        self.shard_size = shard_size
+        self.paths = []
+        self._file = None
+        self._count = 0
+
+    def write(self, item):
+        if self._file is None or self._count == self.shard_size:
+            self._roll()
+        self._file.write(item + "\n")
+        self._count += 1
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        path = shard_path(self.output, len(self.paths))
+        self._file = open(path, "w", encoding="utf-8")
+        self.paths.append(path)
+        self._count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def read_sentences(path):
+    """Read back the blank-line separated sentences written to a bucket file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [item + "\n" for item in f.read().split("\n\n") if item]
 
-# Shuffle dataset
-random.shuffle(conll_data)
+def external_shuffle(sentences, total, shard_size, rng, tmp_dir):
+    """Two-pass shuffle that never holds more than about one shard in memory.
+
+    Pass 1 scatters every sentence into a uniformly random bucket file, pass 2
+    shuffles each bucket in memory and yields it. Every permutation is equally
+    likely, as with random.shuffle over the whole list.
+    """
+    num_buckets = max(1, -(-total // shard_size))
+    bucket_paths = [os.path.join(tmp_dir, f"bucket-{i:05d}.conll") for i in range(num_buckets)]
+    buckets = [open(path, "w", encoding="utf-8") for path in bucket_paths]
+    try:
+        for item in sentences:
+            buckets[rng.randrange(num_buckets)].write(item + "\n")
+    finally:
+        for bucket in buckets:
+            bucket.close()
+
+    for path in bucket_paths:
+        items = read_sentences(path)
+        os.remove(path)
+        rng.shuffle(items)
+        yield from items
+
+def write_conll(items, output):
+    with open(output, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(item + "\n")
 
 # -------------------------
-# Save to CoNLL file
+# Main
 # -------------------------
-with open("synthetic_contextual_balanced.conll", "w", encoding="utf-8") as f:
-    for item in conll_data:
-        f.write(item + "\n")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the balanced contextual PII CoNLL dataset.")
+    parser.add_argument("--addresses", default=ADDRESSES_CSV, help="augmented addresses CSV")
+    parser.add_argument("--names", default=NAMES_CSV, help="names CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="output CoNLL file (shards get a -NNNNN suffix)")
+    parser.add_argument("--total", type=int, default=TOTAL_SENTENCES, help="number of sentences to generate")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a reproducible corpus")
+    parser.add_argument("--stream", action="store_true",
+                        help="write shuffled fixed-size shards with bounded memory instead of one in-memory list")
+    parser.add_argument("--shard-size", type=int, default=500_000, help="sentences per shard in --stream mode")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="generator processes; the corpus is identical for any worker count")
+    parser.add_argument("--dedup", choices=["exact", "bloom"], default=None,
+                        help="drop repeated sentences using 64-bit fingerprints (exact) or a fixed-size Bloom filter")
+    parser.add_argument("--dedup-path", default=None,
+                        help="with --dedup bloom, memory-map the filter's bits at this file instead of holding them in RAM")
+    parser.add_argument("--sampling", choices=["random", "balanced"], default="random",
+                        help="random: an independent random.choice per sentence, the corpus earlier versions "
+                             "wrote for a seed; balanced: every name, address and template used within one "
+                             "time of uniform, a different corpus for the same seed")
+    args = parser.parse_args()
+    if args.dedup_path and args.dedup != "bloom":
+        parser.error("--dedup-path needs --dedup bloom")
+    return args
+
+def main():
+    args = parse_args()
+    name_list, address_list = load_data(args.addresses, args.names)
+
+    num_per_combo = args.total // (len(SCENARIOS) * len(TYPES))  # 12000/6 = 2000
+    total = num_per_combo * len(SCENARIOS) * len(TYPES)
+
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2**32)
+    sentences = generate_conll(name_list, address_list, num_per_combo, seed, args.workers, args.sampling)
+    dedup = None
+    if args.dedup:
+        dedup = Deduplicator(make_index(args.dedup, capacity=total, path=args.dedup_path))
+        sentences = dedup.filter(sentences)
+    # Shuffle with a separate stream so both modes emit the same sentences for the same seed
+    shuffle_rng = random.Random(f"{seed}-shuffle")
+    started = time.perf_counter()
+
+    if not args.stream:
+        conll_data = list(sentences)
+        # Shuffle dataset
+        shuffle_rng.shuffle(conll_data)
+        write_conll(conll_data, args.output)
+        written = len(conll_data)
+        done = f"Dataset generation complete: {args.output}"
+    else:
+        out_dir = os.path.dirname(os.path.abspath(args.output))
+        writer = ShardWriter(args.output, args.shard_size)
+        written = 0
+        with tempfile.TemporaryDirectory(dir=out_dir) as tmp_dir:
+            try:
+                for item in external_shuffle(sentences, total, args.shard_size, shuffle_rng, tmp_dir):
+                    writer.write(item)
+                    written += 1
+            finally:
+                writer.close()
+        done = (f"Dataset generation complete: {len(writer.paths)} shards of up to {args.shard_size} sentences "
+                f"({shard_path(args.output, 0)} ...)")
+
+    elapsed = time.perf_counter() - started
+    print(done)
+    # With --dedup fewer than `total` sentences are written
+    print(f"{written} sentences in {elapsed:.1f}s ({written / elapsed:,.0f} sentences/sec, "
+          f"{args.workers} worker(s), seed {seed})")
+    if dedup:
+        print(f"Dedup: {dedup.summary()}")
 
-print("Dataset generation complete: synthetic_dataset_contextual_balanced.conll")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
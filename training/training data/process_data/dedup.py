@@ -0,0 +1,152 @@
+import hashlib
+import math
+
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:  # fall back to hashlib, slower but dependency-free
+    xxhash = None
+
+# -------------------------
+# Fingerprints
+# -------------------------
+def fingerprint(text):
+    """64-bit fingerprint of a string."""
+    data = text.encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+def fingerprints(texts):
+    """Fingerprints of many strings as a uint64 array."""
+    return np.fromiter((fingerprint(t) for t in texts), dtype=np.uint64, count=len(texts))
+
+# -------------------------
+# Seen-sets
+# -------------------------
+class FingerprintSet:
+    """Exact seen-set of 64-bit fingerprints, 8 bytes per distinct item.
+
+    Fingerprints live in a few sorted runs whose sizes at least double from
+    newest to oldest (like a binary counter), so inserting n items costs
+    O(n log n) overall and a lookup is a handful of binary searches.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def contains_batch(self, fps):
+        found = np.zeros(len(fps), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, fps)
+            pos[pos == len(run)] = 0
+            found |= run[pos] == fps
+        return found
+
+    def add_batch(self, fps):
+        """Add fingerprints; return a mask of the ones not seen before (first occurrence only)."""
+        fps = np.asarray(fps, dtype=np.uint64)
+        new = _first_occurrences(fps) & ~self.contains_batch(fps)
+        if new.any():
+            self._runs.append(np.sort(fps[new]))
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                newest = self._runs.pop()
+                self._runs[-1] = np.sort(np.concatenate([self._runs[-1], newest]), kind="mergesort")
+        return new
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit fingerprints.
+
+    Memory (or disk, when `path` is given and the bits are memory-mapped) is
+    fixed up front from `capacity` and `error_rate`, whatever the row count.
+    A false positive drops a unique item as a duplicate with probability
+    about `error_rate`; duplicates are never kept.
+    """
+
+    def __init__(self, capacity, error_rate=1e-3, path=None):
+        capacity = max(1, capacity or 0)  # an empty input still gets a (minimal) filter
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        num_bytes = -(-self.num_bits // 8)
+        if path is None:
+            self._bits = np.zeros(num_bytes, dtype=np.uint8)
+        else:
+            self._bits = np.memmap(path, dtype=np.uint8, mode="w+", shape=(num_bytes,))
+
+    def _positions(self, fps):
+        # Double hashing: the two 32-bit halves of the fingerprint generate all k probes
+        h1 = (fps & np.uint64(0xFFFFFFFF))[:, None]
+        h2 = (fps >> np.uint64(32))[:, None] | np.uint64(1)
+        k = np.arange(self.num_hashes, dtype=np.uint64)[None, :]
+        return (h1 + k * h2) % np.uint64(self.num_bits)
+
+    def contains_batch(self, fps):
+        pos = self._positions(np.asarray(fps, dtype=np.uint64))
+        bits = (self._bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add_batch(self, fps):
+        """Add fingerprints; return a mask of the ones not (probably) seen before."""
+        fps = np.asarray(fps, dtype=np.uint64)
+        new = _first_occurrences(fps) & ~self.contains_batch(fps)
+        pos = self._positions(fps[new]).ravel()
+        np.bitwise_or.at(self._bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        return new
+
+def _first_occurrences(fps):
+    first = np.zeros(len(fps), dtype=bool)
+    first[np.unique(fps, return_index=True)[1]] = True
+    return first
+
+# -------------------------
+# Streaming dedup
+# -------------------------
+class Deduplicator:
+    """Drop exact duplicates from a stream and keep count of what was dropped."""
+
+    def __init__(self, index=None, batch_size=65_536):
+        self.index = index if index is not None else FingerprintSet()
+        self.batch_size = batch_size
+        self.seen = 0
+        self.dropped = 0
+
+    @property
+    def duplicate_rate(self):
+        return self.dropped / self.seen if self.seen else 0.0
+
+    def keep_mask(self, texts):
+        """Mask of texts to keep, in order; updates the counters."""
+        keep = self.index.add_batch(fingerprints(texts))
+        self.seen += len(texts)
+        self.dropped += len(texts) - int(keep.sum())
+        return keep
+
+    def filter(self, items, key=None):
+        """Yield items whose key (the item itself by default) has not been seen, preserving order."""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield from self._flush(batch, key)
+                batch = []
+        if batch:
+            yield from self._flush(batch, key)
+
+    def _flush(self, batch, key):
+        keep = self.keep_mask([key(item) for item in batch] if key else batch)
+        return [item for item, k in zip(batch, keep) if k]
+
+    def summary(self):
+        return f"dropped {self.dropped} of {self.seen} as duplicates ({self.duplicate_rate:.2%})"
+
+def make_index(kind, capacity=None, error_rate=1e-3, path=None):
+    """Build the seen-set for a --dedup choice: 'exact' or 'bloom'."""
+    if kind == "exact":
+        return FingerprintSet()
+    if kind == "bloom":
+        return BloomFilter(capacity, error_rate, path)
+    raise ValueError(f"unknown dedup index: {kind}")
@@ -1,7 +1,10 @@
-import pandas as pd
+import numpy as np
+import argparse
 import random
 import re
 
+from .dedup import Deduplicator, make_index
+
 # -------------------------
 # Helpers for augmentation
 # -------------------------
@@ -27,6 +30,17 @@ NOISE_TOKENS = [
     "(Near Gate 3)"
 ]
 
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# Compiled once instead of on every call
+UNIT_RE = re.compile(r"#(\d{2})-(\d{2,4})")
+CHAR_NOISE_SKIP_RE = re.compile(r"(\d+|S\d+|\#\d+-\d+)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+def _missing(value):
+    """pd.isna for the scalars read_csv gives, without importing pandas."""
+    return value is None or value != value
+
 # Case jitter
 def jitter_case(s: str) -> str:
     return "".join(
@@ -36,7 +50,7 @@ def jitter_case(s: str) -> str:
 
 # Road synonym substitution
 def synonymize_road(s) -> str:
-    if pd.isna(s) or s == "":
+    if _missing(s) or s == "":
         return ""  # skip NaN / empty
     s = str(s)
     for k, v in ROAD_SYNONYMS.items():
@@ -46,10 +60,10 @@ def synonymize_road(s) -> str:
 
 # Unit number variants
 def augment_unit(s: str) -> str:
-    if pd.isna(s) or s == "":
+    if _missing(s) or s == "":
         return ""
     s = str(s)
-    unit_match = re.search(r"#\d{2}-\d{2,4}", s)
+    unit_match = UNIT_RE.search(s)
     if unit_match:
         unit = unit_match.group()
         base = unit.replace("#", "")
@@ -63,7 +77,7 @@ def augment_unit(s: str) -> str:
 
 # Postal variants
 def augment_postal(zip_code) -> str:
-    if pd.isna(zip_code) or zip_code == "":
+    if _missing(zip_code) or zip_code == "":
         return ""
     zip_code = str(zip_code)
     formats = [
@@ -77,19 +91,19 @@ def augment_postal(zip_code) -> str:
 
 # Character noise in building names (skip numeric/postal/unit)
 def char_noise(s: str) -> str:
-    if pd.isna(s) or s == "":
+    if _missing(s) or s == "":
         return ""
     s = str(s)
     words = s.split()
     if not words:
         return s
     i = random.randrange(len(words))
-    if re.match(r"(\d+|S\d+|\#\d+-\d+)", words[i]):
+    if CHAR_NOISE_SKIP_RE.match(words[i]):
         return s
     word = words[i]
     if len(word) > 3:
         pos = random.randrange(len(word))
-        word = word[:pos] + random.choice("abcdefghijklmnopqrstuvwxyz") + word[pos+1:]
+        word = word[:pos] + random.choice(LETTERS) + word[pos+1:]
     words[i] = word
     return " ".join(words)
 
@@ -98,7 +112,7 @@ def char_noise(s: str) -> str:
 # -------------------------
 
 def augment_address(street, zip_code) -> str:
-    if pd.isna(street) or street == "":
+    if _missing(street) or street == "":
         return ""  # skip empty streets
     addr = str(street)
 
@@ -111,7 +125,7 @@ def augment_address(street, zip_code) -> str:
     if random.random() > 0.5:
         addr = addr.replace(",", " ")
     if random.random() > 0.5:
-        addr = re.sub(r"\s+", " ", addr)
+        addr = WHITESPACE_RE.sub(" ", addr)
     if random.random() > 0.2:
         addr = f"{addr} {augment_postal(zip_code)}"
     if random.random() > 0.7:
@@ -121,31 +135,225 @@ def augment_address(street, zip_code) -> str:
 
     return addr
 
+# -------------------------
+# Batch augmentation
+# -------------------------
+
+# Probability that each augment_address step fires, in pipeline order
+STEP_PROBS = {
+    "synonym": 0.7,
+    "unit": 0.5,
+    "jitter": 0.5,
+    "comma": 0.5,
+    "whitespace": 0.5,
+    "postal": 0.8,
+    "noise": 0.3,
+    "char_noise": 0.4,
+}
+
+POSTAL_FORMATS = [("S", ""), ("S(", ")"), ("Singapore ", ""), ("SG ", ""), ("", "")]
+
+def jitter_case_batch(values, rng):
+    """jitter_case over a list of strings with one random draw per character of the whole batch."""
+    joined = "".join(values)
+    lower, upper = joined.lower(), joined.upper()
+    if not (len(lower) == len(upper) == len(joined)):
+        # Case mapping changes the length (e.g. "ß" -> "SS"): fall back to per-string jitter
+        return ["".join(c.upper() if r > 0.7 else c.lower() for c, r in zip(v, rng.random(len(v))))
+                for v in values]
+    lo = np.frombuffer(lower.encode("utf-32-le"), dtype=np.uint32)
+    up = np.frombuffer(upper.encode("utf-32-le"), dtype=np.uint32)
+    mixed = np.where(rng.random(len(lo)) > 0.7, up, lo).tobytes().decode("utf-32-le")
+    ends = np.cumsum([len(v) for v in values])
+    return [mixed[e - len(v):e] for v, e in zip(values, ends)]
+
+def augment_addresses_batch(streets, zip_codes, rng, variants=3):
+    """Vectorized augment_address over whole columns.
+
+    Every random.random() check in augment_address becomes one NumPy mask drawn
+    up front with the same probability, so the output follows the same
+    distribution as the row-by-row loop. Returns the same original/augmented
+    frame, with `variants` consecutive rows per non-empty street.
+    """
+    import pandas as pd
+
+    streets = pd.Series(streets, dtype=object).reset_index(drop=True)
+    zip_codes = pd.Series(zip_codes, dtype=object).reset_index(drop=True)
+    keep = (streets.notna() & (streets != "")).to_numpy()
+    streets = streets[keep].astype(str).to_numpy()
+    zips = zip_codes[keep].astype(str).to_numpy()
+    if not len(streets):
+        return pd.DataFrame(columns=["original", "augmented"])
+
+    original = pd.Series(np.repeat(streets, variants)) + " " + pd.Series(np.repeat(zips, variants))
+    addr = pd.Series(np.repeat(streets, variants))
+    zips = pd.Series(np.repeat(zips, variants))
+    n = len(addr)
+    fire = {step: rng.random(n) < p for step, p in STEP_PROBS.items()}
+
+    # Road synonym substitution: only the first road type present is replaced
+    seen = np.zeros(n, dtype=bool)
+    for road, synonyms in ROAD_SYNONYMS.items():
+        has = addr.str.contains(road, regex=False).to_numpy()
+        rows = fire["synonym"] & has & ~seen
+        seen |= has
+        choice = rng.integers(len(synonyms), size=n)
+        for c, synonym in enumerate(synonyms):
+            addr = addr.mask(rows & (choice == c), addr.str.replace(road, synonym, regex=False))
+
+    # Unit number variants
+    parts = addr.str.extract(UNIT_RE.pattern)
+    rows = fire["unit"] & parts[0].notna().to_numpy()
+    floor, unit_no = parts[0][rows], parts[1][rows]
+    unit = "#" + floor + "-" + unit_no
+    unit_variants = [unit, "#" + floor.astype(int).astype(str) + "-" + unit_no, "#" + floor + "-" + unit_no.str[:2]]
+    choice = rng.integers(len(unit_variants), size=len(unit))
+    replacement = np.select([choice == c for c in range(len(unit_variants))],
+                            [v.to_numpy(dtype=object) for v in unit_variants])
+    addr[rows] = [s.replace(u, r) for s, u, r in zip(addr[rows], unit, replacement)]
+
+    # Case jitter
+    rows = fire["jitter"]
+    addr[rows] = jitter_case_batch(addr[rows].tolist(), rng)
+
+    addr = addr.mask(fire["comma"], addr.str.replace(",", " ", regex=False))
+    addr = addr.mask(fire["whitespace"], addr.str.replace(WHITESPACE_RE.pattern, " ", regex=True))
+
+    # Postal variants
+    choice = rng.integers(len(POSTAL_FORMATS), size=n)
+    prefix = pd.Series([p for p, _ in POSTAL_FORMATS])[choice].reset_index(drop=True)
+    suffix = pd.Series([s for _, s in POSTAL_FORMATS])[choice].reset_index(drop=True)
+    postal = (prefix + zips + suffix).mask((zips == "").to_numpy(), "")
+    addr = addr.mask(fire["postal"], addr + " " + postal)
+
+    # Extra noise tokens
+    noise = pd.Series(NOISE_TOKENS)[rng.integers(len(NOISE_TOKENS), size=n)].reset_index(drop=True)
+    addr = addr.mask(fire["noise"], addr + " " + noise)
+
+    # Character noise: word, position and letter come from pre-drawn uniforms
+    rows = fire["char_noise"]
+    draws = rng.random((3, int(rows.sum())))
+    addr[rows] = [_char_noise_from_draws(s, u_word, u_pos, u_letter)
+                  for s, u_word, u_pos, u_letter in zip(addr[rows], *draws)]
+
+    return pd.DataFrame({"original": original, "augmented": addr})
+
+def _char_noise_from_draws(s, u_word, u_pos, u_letter):
+    """char_noise with its random choices supplied as uniforms in [0, 1)."""
+    words = s.split()
+    if not words:
+        return s
+    i = int(u_word * len(words))
+    if CHAR_NOISE_SKIP_RE.match(words[i]):
+        return s
+    word = words[i]
+    if len(word) > 3:
+        pos = int(u_pos * len(word))
+        word = word[:pos] + LETTERS[int(u_letter * len(LETTERS))] + word[pos+1:]
+    words[i] = word
+    return " ".join(words)
+
 # -------------------------
 # Run over dataset
 # -------------------------
 
-df = pd.read_csv("addresses.csv")  # Make sure columns: street, zip_code exist
-augmented = []
+CHUNK_ROWS = 65_536  # input addresses augmented, deduplicated and written at a time
+
+def augment_rows(df, variants=3):
+    """Row-by-row augmentation with augment_address."""
+    import pandas as pd
+
+    augmented = []
+
+    for _, row in df.iterrows():
+        street = row.get("street", "")
+        zip_code = row.get("zip_code", "")
+
+        # Skip empty streets
+        if _missing(street) or street == "":
+            continue
+
+        street_str = str(street)
+        zip_str = str(zip_code)
+
+        for _ in range(variants):  # generate multiple variants per row
+            augmented.append({
+                "original": f"{street_str} {zip_str}",
+                "augmented": augment_address(street_str, zip_str)
+            })
+
+    return pd.DataFrame(augmented, columns=["original", "augmented"])
+
+def augment_chunks(df, variants=3, rng=None, chunk_rows=CHUNK_ROWS):
+    """Yield the augmented frame of each run of chunk_rows input rows in turn.
+
+    With rng (a numpy Generator) each run goes through augment_addresses_batch,
+    otherwise through augment_rows. Row by row the output does not depend on
+    chunk_rows; the batch masks are drawn per run.
+    """
+    import pandas as pd
+
+    for start in range(0, len(df), chunk_rows):
+        part = df.iloc[start:start + chunk_rows]
+        if rng is None:
+            yield augment_rows(part, variants)
+        else:
+            zip_codes = part["zip_code"] if "zip_code" in part else pd.Series("", index=part.index)
+            yield augment_addresses_batch(part["street"], zip_codes, rng, variants)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Augment scraped addresses into noisy variants.")
+    parser.add_argument("--input", default="addresses.csv", help="CSV with street and zip_code columns")
+    parser.add_argument("--output", default="augmented_addresses.csv")
+    parser.add_argument("--variants", type=int, default=3, help="augmented variants per address")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch", action="store_true",
+                        help="augment whole columns at once with NumPy masks instead of row by row")
+    parser.add_argument("--dedup", choices=["exact", "bloom"], default=None,
+                        help="drop augmented variants that were already emitted")
+    parser.add_argument("--dedup-path", default=None,
+                        help="with --dedup bloom, memory-map the filter's bits at this file instead of holding them in RAM")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="input addresses augmented and written at a time; bounds memory")
+    args = parser.parse_args()
+    if args.dedup_path and args.dedup != "bloom":
+        parser.error("--dedup-path needs --dedup bloom")
+    return args
+
+def main():
+    import pandas as pd
+
+    args = parse_args()
+    df = pd.read_csv(args.input)  # Make sure columns: street, zip_code exist
 
-for _, row in df.iterrows():
-    street = row.get("street", "")
-    zip_code = row.get("zip_code", "")
+    rng = None
+    if args.batch:
+        rng = np.random.default_rng(args.seed)
+    else:
+        random.seed(args.seed)
 
-    # Skip empty streets
-    if pd.isna(street) or street == "":
-        continue
+    dedup = None
+    if args.dedup:
+        streets = df["street"]
+        capacity = int((streets.notna() & (streets != "")).sum()) * args.variants
+        dedup = Deduplicator(make_index(args.dedup, capacity=capacity, path=args.dedup_path))
 
-    street_str = str(street)
-    zip_str = str(zip_code)
+    # Each chunk is filtered and appended as soon as it is generated, so only
+    # one chunk of augmented rows is ever held in memory
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        header = True
+        for out_df in augment_chunks(df, args.variants, rng, args.chunk_rows):
+            if dedup:
+                out_df = out_df[dedup.keep_mask(out_df["augmented"].tolist())]
+            out_df.to_csv(f, index=False, header=header)
+            header = False
+        if header:  # no input rows
+            pd.DataFrame(columns=["original", "augmented"]).to_csv(f, index=False)
 
-    for _ in range(3):  # generate multiple variants per row
-        augmented.append({
-            "original": f"{street_str} {zip_str}",
-            "augmented": augment_address(street_str, zip_str)
-        })
+    if dedup:
+        print(f"Dedup: {dedup.summary()}")
 
-out_df = pd.DataFrame(augmented)
-out_df.to_csv("augmented_addresses.csv", index=False)
+    print("Augmented dataset saved")
 
-print("Augmented dataset saved")
+if __name__ == "__main__":
+    main()
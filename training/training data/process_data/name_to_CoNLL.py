@@ -1,8 +1,10 @@
-import pandas as pd
+import argparse
 import random
 
-# Load CSV of names
-df = pd.read_csv("sg_names.csv") 
+import numpy as np
+
+from .sampler import balanced_indices
+from .templates import compile_templates
 
 # Expanded templates for context-aware training
 TEMPLATES = {
@@ -52,53 +54,94 @@ TEMPLATES = {
     ]
 }
 
-# Store all sentences before shuffling
-all_sentences = []
-
-for _, row in df.iterrows():
-    name = row["name"].strip()
-    
-    # Generate 2-3 positive and 2-3 negative sentences per name
-    for _ in range(random.randint(2, 3)):
-        template = random.choice(TEMPLATES["pii"])
-        sentence = template.format(name=name)
-        all_sentences.append((sentence, name, True))
-    for _ in range(random.randint(2, 3)):
-        template = random.choice(TEMPLATES["non_pii"])
-        sentence = template.format(name=name)
-        all_sentences.append((sentence, name, False))
-
-# Shuffle all sentences
-random.shuffle(all_sentences)
-
-conll_lines = []
-
-for sentence, name, is_pii in all_sentences:
-    words = sentence.split()
-    
-    if is_pii:
-        labels = ["O"] * len(words)
-        name_tokens = name.split()
-        n = len(name_tokens)
-
-        # Look for all occurrences of the name in the sentence
-        for i in range(len(words) - n + 1):
-            if words[i:i+n] == name_tokens:
-                labels[i] = "B-PER"
-                for j in range(1, n):
-                    labels[i+j] = "I-PER"
-        
-        for word, label in zip(words, labels):
-            conll_lines.append(f"{word} {label}")
+# Compiled once; only PII sentences label the name, non-PII ones are all O
+COMPILED = {
+    "pii": compile_templates(TEMPLATES["pii"], {"name": "PER"}),
+    "non_pii": compile_templates(TEMPLATES["non_pii"]),
+}
+
+def make_sentences(names):
+    """2-3 PII and 2-3 non-PII templates per name, as (compiled template, name), shuffled."""
+    # Store all sentences before shuffling
+    all_sentences = []
+
+    for name in names:
+        name = name.strip()
+
+        # Generate 2-3 positive and 2-3 negative sentences per name
+        for _ in range(random.randint(2, 3)):
+            all_sentences.append((random.choice(COMPILED["pii"]), name))
+        for _ in range(random.randint(2, 3)):
+            all_sentences.append((random.choice(COMPILED["non_pii"]), name))
+
+    # Shuffle all sentences
+    random.shuffle(all_sentences)
+    return all_sentences
+
+def plan_sentences(names, rng):
+    """make_sentences with NumPy index arrays instead of a loop of random calls.
+
+    Each name still gets 2-3 PII and 2-3 non-PII sentences, but the templates
+    come from balanced_indices, so every template of a list is used within
+    one time of the others. rng is a numpy.random.Generator.
+    """
+    names = [name.strip() for name in names]
+    per_name = rng.integers(2, 4, size=(2, len(names)))
+    name_idx, template_idx, is_pii = [], [], []
+    for row, key in enumerate(["pii", "non_pii"]):
+        name_idx.append(np.repeat(np.arange(len(names)), per_name[row]))
+        template_idx.append(balanced_indices(len(COMPILED[key]), len(name_idx[-1]), rng))
+        is_pii.append(np.full(len(name_idx[-1]), key == "pii"))
+
+    # Shuffle all sentences
+    order = rng.permutation(sum(len(idx) for idx in name_idx))
+    name_idx, template_idx, is_pii = (np.concatenate(a)[order].tolist() for a in (name_idx, template_idx, is_pii))
+    return [(COMPILED["pii" if pii else "non_pii"][t], names[n])
+            for n, t, pii in zip(name_idx, template_idx, is_pii)]
+
+def template_to_conll_lines(template, name):
+    """CoNLL lines ("word label") for a compiled template filled with name.
+
+    Every {name} slot of a PII template is labelled B-PER/I-PER as it is filled;
+    non-PII templates carry no tag, so their words are all O.
+    """
+    words, labels = template.fill({"name": name})
+    return [f"{word} {label}" for word, label in zip(words, labels)]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Turn generated names into shuffled CoNLL sentences.")
+    parser.add_argument("--input", default="sg_names.csv", help="CSV with a name column")
+    parser.add_argument("--output", default="names_conll_shuffled.conll")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sampling", choices=["random", "balanced"], default="random",
+                        help="random: an independent random.choice per sentence, the output earlier versions "
+                             "wrote for a seed; balanced: every template used within one time of uniform")
+    return parser.parse_args()
+
+def main():
+    import pandas as pd
+
+    args = parse_args()
+    random.seed(args.seed)
+
+    # Load CSV of names
+    df = pd.read_csv(args.input)
+
+    conll_lines = []
+
+    if args.sampling == "balanced":
+        sentences = plan_sentences(df["name"], np.random.default_rng(args.seed))
     else:
-        # Label all tokens as O
-        for word in words:
-            conll_lines.append(f"{word} O")
-    
-    conll_lines.append("")  # blank line to separate sentences
+        sentences = make_sentences(df["name"])
+    for template, name in sentences:
+        conll_lines.extend(template_to_conll_lines(template, name))
+        conll_lines.append("")  # blank line to separate sentences
+
+    # Write to CoNLL file
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("\n".join(conll_lines))
 
-# Write to CoNLL file
-with open("names_conll_shuffled.conll", "w", encoding="utf-8") as f:
-    f.write("\n".join(conll_lines))
+    print(f"Shuffled and diverse CoNLL file created: {args.output}")
 
-print("Shuffled and diverse CoNLL file created: names_conll_shuffled.conll")
+if __name__ == "__main__":
+    main()
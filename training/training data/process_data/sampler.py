@@ -0,0 +1,67 @@
+"""Balanced index streams for drawing names, addresses and templates.
+
+Drawing every sentence's name, address and template with random.choice leaves
+some of them unused and others used many times over. Instead, each stream here
+is cut into blocks of n draws that are each a fresh random permutation of
+range(n), so any prefix of the stream uses every index within one time of
+every other.
+
+A stream is drawn lazily, a chunk at a time, and only holds the draws for the
+current chunk plus the unused tail of one block, so planning a corpus of any
+size takes the same memory.
+"""
+import numpy as np
+
+# -------------------------
+# Balanced index streams
+# -------------------------
+# Short blocks are shuffled many at once, one row per block, by sorting random
+# keys: about three times faster than Generator.permuted on rows that short,
+# and with 32-bit keys for at most SORT_MAX items a tie (which only orders two
+# items by position) is rare.
+
+SORT_MAX = 1024  # longest block shuffled by sorting random keys
+
+class BalancedStream:
+    """Endless stream of indices into range(n), every block of n consecutive ones a fresh permutation.
+
+    rng is a numpy.random.Generator. take(count) returns the next count
+    indices; across any run of takes each index is used (total // n) or
+    (total // n) + 1 times.
+    """
+
+    def __init__(self, n, rng):
+        if n <= 0:
+            raise ValueError(f"cannot draw indices from an empty range of {n}")
+        self.n = n
+        self.rng = rng
+        self._drawn = np.empty(0, dtype=np.int32)
+        self._pos = 0
+
+    def take(self, count):
+        rest = self._drawn[self._pos:]
+        if count > len(rest):
+            blocks = -(-(count - len(rest)) // self.n)
+            fresh = self._permutations(blocks)
+            self._drawn = np.concatenate([rest, fresh]) if len(rest) else fresh
+            self._pos = 0
+        drawn = self._drawn[self._pos:self._pos + count]
+        self._pos += count
+        return drawn
+
+    def _permutations(self, blocks):
+        """blocks fresh random permutations of range(n), end to end."""
+        if self.n <= SORT_MAX:
+            keys = self.rng.integers(0, 2**32, (blocks, self.n), dtype=np.uint32)
+            return np.argsort(keys, axis=1).astype(np.int32).ravel()
+        return self.rng.permuted(np.tile(np.arange(self.n, dtype=np.int32), (blocks, 1)), axis=1).ravel()
+
+def balanced_indices(n, count, rng):
+    """count indices into range(n), every block of n consecutive ones a permutation of range(n).
+
+    Each index is used count // n or count // n + 1 times. rng is a
+    numpy.random.Generator.
+    """
+    if count <= 0:
+        return np.empty(0, dtype=np.int32)
+    return BalancedStream(n, rng).take(count)
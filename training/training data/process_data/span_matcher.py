@@ -0,0 +1,35 @@
+# -------------------------
+# Single pattern: Knuth-Morris-Pratt
+# -------------------------
+def kmp_table(pattern):
+    """Failure table: length of the longest proper border of pattern[:i+1]."""
+    fail = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = fail[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        fail[i] = k
+    return fail
+
+def kmp_search(tokens, pattern, overlapping=True):
+    """Yield the start index of every occurrence of pattern in tokens, left to right.
+
+    With overlapping=False the scan restarts after each match, which gives the
+    same leftmost, non-overlapping matches as a slide-and-skip loop.
+    """
+    m = len(pattern)
+    if m == 0:
+        return
+    fail = kmp_table(pattern)
+    k = 0
+    for i, tok in enumerate(tokens):
+        while k and tok != pattern[k]:
+            k = fail[k - 1]
+        if tok == pattern[k]:
+            k += 1
+        if k == m:
+            yield i - m + 1
+            k = fail[k - 1] if overlapping else 0
+
@@ -0,0 +1,106 @@
+"""Sentence templates with {slot} placeholders, compiled once and filled with labels.
+
+A template such as "Dr. {name} lives at {address}." is split on whitespace
+once, into literal tokens and slots. A slot keeps the punctuation glued to it
+("{address}." -> slot "address", suffix "."). Filling a template splices the
+entity's own whitespace tokens into each slot, so the tokens are exactly
+template.format(...).split() and every entity token is labelled as it is
+placed: nothing is searched for afterwards, punctuation at the edges cannot
+hide an entity, and a slot used twice is labelled twice.
+"""
+import re
+
+# -------------------------
+# Slot templates
+# -------------------------
+
+SLOT_RE = re.compile(r"\{(\w+)\}")
+
+class Template:
+    """One compiled template.
+
+    tags maps a slot name to its entity tag ("name" -> "PER"); slots without
+    a tag are filled but labelled O. prefixes maps a slot name to literal
+    tokens that belong to the entity when they come right before the slot,
+    such as the "Dr." of "Dr. {name}".
+    """
+
+    def __init__(self, text, tags=None, prefixes=None):
+        self.text = text
+        tags = tags or {}
+        prefixes = prefixes or {}
+        chunks = text.split()
+        parsed = []
+        for chunk in chunks:
+            pieces = SLOT_RE.split(chunk)
+            if len(pieces) == 1:
+                parsed.append((chunk, None, ""))
+            elif len(pieces) == 3:
+                parsed.append((pieces[0], pieces[1], pieces[2]))
+            else:
+                raise ValueError(f"more than one slot in the token {chunk!r} of template {text!r}")
+
+        # (literal or prefix, slot, suffix, tag, continues): continues marks a
+        # slot whose entity already started at the prefix token before it
+        self.parts = []
+        for i, (head, slot, tail) in enumerate(parsed):
+            nxt = parsed[i + 1][1] if i + 1 < len(parsed) else None
+            if slot is None and nxt is not None and tags.get(nxt) and head in prefixes.get(nxt, ()):
+                self.parts.append((head, None, "", tags[nxt], False))
+            elif slot is None:
+                self.parts.append((head, None, "", None, False))
+            else:
+                folded = i > 0 and parsed[i - 1][1] is None and tags.get(slot) is not None \
+                    and parsed[i - 1][0] in prefixes.get(slot, ())
+                self.parts.append((head, slot, tail, tags.get(slot), folded))
+        self.slots = sorted({slot for _, slot, _, _, _ in self.parts if slot is not None})
+
+    def fill(self, values):
+        """(tokens, labels) with values[slot] spliced into every slot."""
+        tokens, labels = [], []
+        for head, slot, tail, tag, continues in self.parts:
+            if slot is None:
+                tokens.append(head)
+                labels.append(f"B-{tag}" if tag else "O")
+                continue
+            value = values[slot]
+            words = value.split()
+            if not words:
+                if value and (head or tail):  # whitespace only: head and tail come apart
+                    tokens.extend(t for t in (head, tail) if t)
+                    labels.extend("O" for t in (head, tail) if t)
+                elif head or tail:
+                    tokens.append(head + tail)
+                    labels.append("O")
+                continue
+            # Punctuation sticks to the entity unless the value itself starts or ends with whitespace
+            if head and value[0].isspace():
+                tokens.append(head)
+                labels.append("O")
+            elif head:
+                words[0] = head + words[0]
+            detached = tail and value[-1].isspace()
+            if tail and not detached:
+                words[-1] = words[-1] + tail
+            tokens.extend(words)
+            if tag is None:
+                labels.extend(["O"] * len(words))
+            else:
+                labels.append(f"I-{tag}" if continues else f"B-{tag}")
+                labels.extend([f"I-{tag}"] * (len(words) - 1))
+            if detached:
+                tokens.append(tail)
+                labels.append("O")
+        return tokens, labels
+
+    def format(self, **values):
+        return self.text.format(**values)
+
+    def __repr__(self):
+        return f"Template({self.text!r})"
+
+def compile_templates(texts, tags=None, prefixes=None):
+    """Compile a list of template strings, or a {key: list} dict of them, with the same tags."""
+    if isinstance(texts, dict):
+        return {key: compile_templates(value, tags, prefixes) for key, value in texts.items()}
+    return [Template(text, tags, prefixes) for text in texts]